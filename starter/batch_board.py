@@ -0,0 +1,283 @@
+"""NumPy boards for stepping many games at once.
+
+A BatchBoard holds the fleet grids, target grids and hits lists of a batch
+of games with the same grid size and fleet, as arrays:
+
+    fleet: uint8 array of shape (games, n, n), 0 for EMPTY and i + 1 for
+        ships[i]
+    target: uint8 array of shape (games, n, n), with the TARGET_* codes
+    hits: int array of shape (games, len(ships)), the hits list of each game
+
+Each method works on the whole batch (or on the games selected by an index
+array) with array operations, instead of looping over the games in Python.
+
+NumPy is only needed for this module: the rest of the game runs without it.
+"""
+
+from typing import List
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError('batch_board needs NumPy, install it with '
+                      '"pip install numpy"')
+
+import battleship_functions as bf
+
+# The codes in BatchBoard.target
+TARGET_UNKNOWN = 0
+TARGET_MISS = 1
+TARGET_HIT = 2
+
+_TARGET_CHARACTERS = [bf.UNKNOWN, bf.MISS, bf.HIT]
+
+
+def make_empty_grids(games: int, grid_size: int) -> 'np.ndarray':
+    """
+    Return a games by grid_size by grid_size array of EMPTY (0) cells.
+
+    >>> make_empty_grids(2, 3).shape
+    (2, 3, 3)
+    """
+
+    return np.zeros((games, grid_size, grid_size), dtype=np.uint8)
+
+
+def _line_cells(rows1: 'np.ndarray', cols1: 'np.ndarray',
+                rows2: 'np.ndarray', cols2: 'np.ndarray') -> List:
+    """
+    Return the row and column arrays, each of shape (len(rows1), size), of
+    the cells from (rows1, cols1) to (rows2, cols2), inclusive, in either
+    order. Raise ValueError unless every line is horizontal or vertical and
+    they all have the same size.
+
+    >>> rows, cols = _line_cells([2, 0], [0, 1], [0, 0], [0, 3])
+    >>> rows.tolist(), cols.tolist()
+    ([[0, 1, 2], [0, 0, 0]], [[0, 0, 0], [1, 2, 3]])
+    >>> _line_cells([0, 0], [0, 0], [0, 0], [1, 2])
+    Traceback (most recent call last):
+    ValueError: every line must have the same size, not 2 and 3
+    """
+
+    rows1, rows2 = np.minimum(rows1, rows2), np.maximum(rows1, rows2)
+    cols1, cols2 = np.minimum(cols1, cols2), np.maximum(cols1, cols2)
+    if ((rows1 != rows2) & (cols1 != cols2)).any():
+        raise ValueError('every line must be horizontal or vertical')
+    sizes = rows2 - rows1 + cols2 - cols1 + 1
+    if len(sizes) == 0:
+        return [np.zeros((0, 0), dtype=np.int64)] * 2
+    if (sizes != sizes[0]).any():
+        raise ValueError('every line must have the same size, not {0} and '
+                         '{1}'.format(sizes.min(), sizes.max()))
+
+    steps = np.arange(sizes[0])
+    vertical = rows1 != rows2
+    rows = rows1[:, None] + steps * vertical[:, None]
+    cols = cols1[:, None] + steps * ~vertical[:, None]
+    return [rows, cols]
+
+
+class BatchBoard:
+    """The fleet grids, target grids and hits lists of a batch of games.
+
+    === Attributes ===
+    ships: the ship characters, the same for every game
+    sizes: the ship sizes, as an int array
+    fleet: the fleet grids, 0 for EMPTY and i + 1 for ships[i]
+    target: the target grids, with TARGET_UNKNOWN, TARGET_MISS or TARGET_HIT
+    hits: hits[g] is the hits list of game g
+    """
+
+    def __init__(self, games: int, grid_size: int, ships: List[str],
+                 sizes: List[int]) -> None:
+        if len(ships) > 255:
+            raise ValueError('a BatchBoard holds at most 255 ships')
+        self.ships = ships
+        self.sizes = np.array(sizes, dtype=np.int64)
+        self.fleet = make_empty_grids(games, grid_size)
+        self.target = make_empty_grids(games, grid_size)
+        self.hits = np.zeros((games, len(ships)), dtype=np.int64)
+
+    @classmethod
+    def from_fleet_grids(cls, fleet_grids: List[List[List[str]]],
+                         ships: List[str], sizes: List[int]) -> 'BatchBoard':
+        """
+        Return a BatchBoard with a game for each fleet grid in fleet_grids,
+        with nothing shot yet.
+
+        >>> board = BatchBoard.from_fleet_grids(
+        ...     [[['.', 'b'], ['a', 'b']]], ['a', 'b'], [1, 2])
+        >>> board.fleet[0].tolist()
+        [[0, 2], [1, 2]]
+        """
+
+        codes = {bf.EMPTY: 0}
+        for i in range(len(ships)):
+            codes[ships[i]] = i + 1
+
+        board = cls(len(fleet_grids), len(fleet_grids[0]), ships, sizes)
+        board.fleet[:] = [[[codes[cell] for cell in row] for row in grid]
+                          for grid in fleet_grids]
+        return board
+
+    def games(self) -> int:
+        """
+        Return the number of games in the batch.
+        """
+
+        return self.fleet.shape[0]
+
+    def place_ship(self, rows1: 'np.ndarray', cols1: 'np.ndarray',
+                   rows2: 'np.ndarray', cols2: 'np.ndarray', ship: int,
+                   games: 'np.ndarray' = None) -> None:
+        """
+        Place ships[ship] on the fleet grid of each game in games (every
+        game if None) from (rows1[i], cols1[i]) to (rows2[i], cols2[i]),
+        inclusive.
+
+        >>> board = BatchBoard(2, 3, ['d'], [2])
+        >>> board.place_ship([0, 1], [0, 1], [1, 1], [0, 2], 0)
+        >>> board.fleet_grid(0)
+        [['d', '.', '.'], ['d', '.', '.'], ['.', '.', '.']]
+        >>> board.fleet_grid(1)
+        [['.', '.', '.'], ['.', 'd', 'd'], ['.', '.', '.']]
+        """
+
+        if games is None:
+            games = np.arange(self.games())
+        rows, cols = _line_cells(rows1, cols1, rows2, cols2)
+        self.fleet[np.asarray(games)[:, None], rows, cols] = ship + 1
+
+    def is_occupied(self, rows1: 'np.ndarray', cols1: 'np.ndarray',
+                    rows2: 'np.ndarray', cols2: 'np.ndarray',
+                    games: 'np.ndarray' = None) -> 'np.ndarray':
+        """
+        Return a bool array that is True for each game in games (every game
+        if None) whose cells from (rows1[i], cols1[i]) to (rows2[i],
+        cols2[i]), inclusive, are not all EMPTY.
+
+        >>> board = BatchBoard(2, 3, ['d'], [2])
+        >>> board.place_ship([0], [0], [1], [0], 0, [0])
+        >>> board.is_occupied([1, 1], [0, 0], [1, 1], [2, 2]).tolist()
+        [True, False]
+        """
+
+        if games is None:
+            games = np.arange(self.games())
+        rows, cols = _line_cells(rows1, cols1, rows2, cols2)
+        return (self.fleet[np.asarray(games)[:, None], rows, cols] != 0
+                ).any(axis=1)
+
+    def make_move(self, rows: 'np.ndarray', cols: 'np.ndarray',
+                  games: 'np.ndarray' = None) -> 'np.ndarray':
+        """
+        Shoot at (rows[i], cols[i]) in each game in games (every game if
+        None), updating the target grids and hits lists, and return a bool
+        array that is True for the games where a ship was hit. Cells that
+        were already shot are not counted again.
+
+        >>> board = BatchBoard.from_fleet_grids(
+        ...     [[['.', 'a'], ['.', 'a']], [['a', 'a'], ['.', '.']]],
+        ...     ['a'], [2])
+        >>> board.make_move([0, 0], [0, 0]).tolist()
+        [False, True]
+        >>> board.target_grid(0), board.target_grid(1)
+        ([['M', '-'], ['-', '-']], [['X', '-'], ['-', '-']])
+        >>> board.hits.tolist()
+        [[0], [1]]
+        """
+
+        if games is None:
+            games = np.arange(self.games())
+        games = np.asarray(games)
+        rows = np.asarray(rows)
+        cols = np.asarray(cols)
+
+        new = self.target[games, rows, cols] == TARGET_UNKNOWN
+        ships = self.fleet[games, rows, cols].astype(np.int64)
+        hit = ships != 0
+        self.target[games, rows, cols] = np.where(
+            new, np.where(hit, TARGET_HIT, TARGET_MISS),
+            self.target[games, rows, cols])
+        counted = hit & new
+        np.add.at(self.hits, (games[counted], ships[counted] - 1), 1)
+        return hit
+
+    def update_target_grid(self, rows: 'np.ndarray', cols: 'np.ndarray',
+                           games: 'np.ndarray' = None) -> None:
+        """
+        Set the cell at (rows[i], cols[i]) in the target grid of each game in
+        games (every game if None) to HIT or MISS using the fleet grid,
+        without changing the hits lists.
+        """
+
+        if games is None:
+            games = np.arange(self.games())
+        games = np.asarray(games)
+        self.target[games, rows, cols] = np.where(
+            self.fleet[games, rows, cols] != 0, TARGET_HIT, TARGET_MISS)
+
+    def is_win(self) -> 'np.ndarray':
+        """
+        Return a bool array that is True for each game in which every ship
+        has been sunk.
+
+        >>> board = BatchBoard.from_fleet_grids(
+        ...     [[['a', '.'], ['.', '.']], [['.', '.'], ['.', 'a']]],
+        ...     ['a'], [1])
+        >>> _ = board.make_move([0, 0], [0, 0])
+        >>> board.is_win().tolist()
+        [True, False]
+        """
+
+        return (self.hits == self.sizes).all(axis=1)
+
+    def random_moves(self, rng: 'np.random.Generator',
+                     games: 'np.ndarray' = None) -> List:
+        """
+        Return the row and column arrays of a uniformly random UNKNOWN cell
+        in the target grid of each game in games (every game if None). Each
+        of those games must have an UNKNOWN cell.
+        """
+
+        if games is None:
+            games = np.arange(self.games())
+        target = self.target[np.asarray(games)]
+        size = target.shape[1]
+        scores = rng.random(target.shape)
+        scores[target != TARGET_UNKNOWN] = -1.0
+        cells = scores.reshape(len(target), size * size).argmax(axis=1)
+        return [cells // size, cells % size]
+
+    def fleet_grid(self, game: int) -> List[List[str]]:
+        """
+        Return the fleet grid of game as a list of list of str, with hit ship
+        cells in upper-case.
+        """
+
+        grid = []
+        for row, target_row in zip(self.fleet[game].tolist(),
+                                   self.target[game].tolist()):
+            cells = []
+            for code, shot in zip(row, target_row):
+                if code == 0:
+                    cells.append(bf.EMPTY)
+                elif shot == TARGET_HIT:
+                    cells.append(self.ships[code - 1].upper())
+                else:
+                    cells.append(self.ships[code - 1])
+            grid.append(cells)
+        return grid
+
+    def target_grid(self, game: int) -> List[List[str]]:
+        """
+        Return the target grid of game as a list of list of str.
+        """
+
+        return [[_TARGET_CHARACTERS[code] for code in row]
+                for row in self.target[game].tolist()]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,146 @@
+"""Validate many game files at once.
+
+Every game file found in the given files and directories is read and
+validated in a pool of worker processes, and a JSON report line is written
+for each one:
+
+    python batch_validate.py --report report.jsonl games/ bad1.txt
+"""
+
+import argparse
+import fnmatch
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, TextIO
+
+import battleship_functions as bf
+import play_battleship as pb
+
+
+def find_game_files(paths: List[str], pattern: str) -> Iterator[str]:
+    """
+    Yield each file in paths, and each file whose name matches pattern in
+    the directories in paths (searched recursively), in sorted order.
+    """
+
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if fnmatch.fnmatch(name, pattern):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def validate_game_file(filename: str) -> Dict:
+    """
+    Return the report for the game file filename: a dictionary with the
+    file name, whether the game is valid, and the reason it is not valid
+    (None for a valid game).
+
+    >>> validate_game_file('game1.txt')
+    {'file': 'game1.txt', 'valid': True, 'reason': None}
+    >>> validate_game_file('bad3.txt')['reason']
+    'ship t has 0 cells but should have 2; p is not a ship in this game'
+    """
+
+    try:
+        with open(filename) as game_file:
+            ships, sizes = bf.read_ship_data(game_file)
+            fleet_grid = pb.read_fleet_grid(game_file)
+    except (OSError, UnicodeDecodeError, ValueError) as error:
+        return {'file': filename, 'valid': False,
+                'reason': 'unreadable: {0}'.format(error)}
+
+    if not pb.validate_game_parameters(fleet_grid, ships, sizes):
+        reason = 'invalid game parameters'
+    else:
+        problems = bf.find_fleet_problems(fleet_grid, ships, sizes)
+        reason = '; '.join(describe_problem(character, problems[character])
+                           for character in problems) or None
+
+    return {'file': filename, 'valid': reason is None, 'reason': reason}
+
+
+def describe_problem(character: str, problem: str) -> str:
+    """
+    Return a sentence for the problem with character from
+    battleship_functions.find_fleet_problems.
+
+    >>> describe_problem('a', 'has a gap between its cells')
+    'ship a has a gap between its cells'
+    >>> describe_problem('z', 'is not a ship in this game')
+    'z is not a ship in this game'
+    """
+
+    if problem.startswith('is not a ship'):
+        return '{0} {1}'.format(character, problem)
+    return 'ship {0} {1}'.format(character, problem)
+
+
+def validate_game_files(filenames: Iterator[str], report_file: TextIO,
+                        processes: int = None,
+                        chunksize: int = 64) -> Dict:
+    """
+    Validate every game file in filenames with a pool of processes worker
+    processes (the number of CPUs if None), writing one JSON report line per
+    file to report_file in the order of filenames. Return the throughput
+    statistics for the run.
+    """
+
+    counts = {'files': 0, 'valid': 0, 'invalid': 0}
+    start = time.perf_counter()
+
+    with multiprocessing.Pool(processes) as pool:
+        for report in pool.imap(validate_game_file, filenames, chunksize):
+            report_file.write(json.dumps(report) + '\n')
+            counts['files'] += 1
+            if report['valid']:
+                counts['valid'] += 1
+            else:
+                counts['invalid'] += 1
+
+    seconds = time.perf_counter() - start
+    counts['seconds'] = round(seconds, 6)
+    if seconds > 0:
+        counts['files_per_second'] = round(counts['files'] / seconds, 1)
+    else:
+        counts['files_per_second'] = None
+    return counts
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Run the batch validator with the command line arguments argv, and return
+    the exit status: 0 if every game is valid and 1 otherwise.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+',
+                        help='game files or directories of game files')
+    parser.add_argument('--pattern', default='*.txt',
+                        help='file name pattern searched for in directories')
+    parser.add_argument('--report', help='JSONL report file (default stdout)')
+    parser.add_argument('--processes', type=int,
+                        help='number of worker processes')
+    args = parser.parse_args(argv)
+
+    filenames = find_game_files(args.paths, args.pattern)
+    if args.report is None:
+        stats = validate_game_files(filenames, sys.stdout, args.processes)
+    else:
+        with open(args.report, 'w') as report_file:
+            stats = validate_game_files(filenames, report_file,
+                                        args.processes)
+
+    print(json.dumps(stats), file=sys.stderr)
+    return 0 if stats['invalid'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
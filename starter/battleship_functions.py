@@ -1,7 +1,9 @@
 """Battleship Functions"""
 
 # Use these constants in your code
-from typing import TextIO, List
+from typing import TextIO, List, Dict
+
+import bitboard
 
 MIN_SHIP_SIZE = 1
 MAX_SHIP_SIZE = 10
@@ -156,8 +158,161 @@ def validate_fleet_grid(fleet_grid, ships, sizes):
     """
     
     # Is fleet_grid valid fleet grid for the game
-    return validate_character_count(fleet_grid, ships, sizes) and \
-           validate_ship_positions(fleet_grid, ships, sizes)
+    return len(find_fleet_problems(fleet_grid, ships, sizes)) == 0
+
+def find_fleet_problems(fleet_grid: List[List[str]], ships: List[str],
+                        sizes: List[int]) -> Dict[str, str]:
+    
+    """
+    This function returns a dictionary that maps each ship character with a 
+    problem to a message describing it. A ship has a problem if it has the 
+    wrong number of cells, if it is not in a single row or column, or if its 
+    cells are not consecutive. Any other non-EMPTY character is also reported. 
+    The grid is scanned once, recording a bitmask of the cells of each 
+    character; a ship with the right number of cells is valid iff its mask 
+    is one of bitboard.placement_masks. A grid that is not square is checked 
+    with bounding boxes instead.
+
+    >>> fleet_grid = [['.','b','.'], ['.','b','.'], ['a','a','a']]
+    >>> find_fleet_problems(fleet_grid, ['a', 'b'], [3, 2])
+    {}
+    >>> fleet_grid = [['b','.','.'], ['.','b','z'], ['a','.','a']]
+    >>> problems = find_fleet_problems(fleet_grid, ['a', 'b'], [3, 2])
+    >>> problems['a']
+    'has 2 cells but should have 3'
+    >>> problems['b']
+    'is not in a single row or column'
+    >>> problems['z']
+    'is not a ship in this game'
+    """
+    
+    grid_size = len(fleet_grid)
+    for row in fleet_grid:
+        if len(row) != grid_size:
+            return find_grid_box_problems(fleet_grid, ships, sizes)
+
+    counts = {}
+    masks = {}
+    bit = 1
+    for row in fleet_grid:
+        for cell in row:
+            if cell != EMPTY:
+                if cell in masks:
+                    masks[cell] = masks[cell] | bit
+                    counts[cell] = counts[cell] + 1
+                else:
+                    masks[cell] = bit
+                    counts[cell] = 1
+            bit = bit << 1
+
+    problems = {}
+    for i in range(len(ships)):
+        count = counts.get(ships[i], 0)
+        if count != sizes[i]:
+            problems[ships[i]] = 'has {0} cells but should have {1}'.format(
+                count, sizes[i])
+        elif count > 0 and masks[ships[i]] not in bitboard.placement_masks(
+                grid_size, sizes[i]):
+            rows = set()
+            cols = set()
+            for index in range(grid_size * grid_size):
+                if masks[ships[i]] >> index & 1:
+                    rows.add(index // grid_size)
+                    cols.add(index % grid_size)
+            if len(rows) != 1 and len(cols) != 1:
+                problems[ships[i]] = 'is not in a single row or column'
+            else:
+                problems[ships[i]] = 'has a gap between its cells'
+
+    for character in counts:
+        if character not in ships:
+            problems[character] = 'is not a ship in this game'
+
+    return problems
+
+def find_grid_box_problems(fleet_grid: List[List[str]], ships: List[str],
+                           sizes: List[int]) -> Dict[str, str]:
+    
+    """
+    This function returns the problems of find_fleet_problems for a 
+    fleet_grid of any shape, from the cell count and bounding box of each 
+    character.
+
+    >>> find_grid_box_problems([['a', '.', 'a']], ['a'], [2])
+    {'a': 'has a gap between its cells'}
+    """
+    
+    counts = {}
+    boxes = {}
+    for row in range(len(fleet_grid)):
+        col = 0
+        for cell in fleet_grid[row]:
+            if cell != EMPTY:
+                add_to_box(counts, boxes, cell, row, col)
+            col = col + 1
+
+    return find_box_problems(counts, boxes, ships, sizes)
+
+def add_to_box(counts: Dict[str, int], boxes: Dict[str, List[int]],
+               character: str, row: int, col: int) -> None:
+    
+    """
+    This function counts the cell at row and col for character in counts, 
+    and grows the bounding box of character in boxes to contain the cell. 
+    Each box is [top row, left col, bottom row, right col].
+
+    >>> counts = {}
+    >>> boxes = {}
+    >>> add_to_box(counts, boxes, 'a', 2, 0)
+    >>> add_to_box(counts, boxes, 'a', 0, 1)
+    >>> counts, boxes
+    ({'a': 2}, {'a': [0, 0, 2, 1]})
+    """
+    
+    if character in boxes:
+        box = boxes[character]
+        box[0] = min(box[0], row)
+        box[1] = min(box[1], col)
+        box[2] = max(box[2], row)
+        box[3] = max(box[3], col)
+        counts[character] = counts[character] + 1
+    else:
+        boxes[character] = [row, col, row, col]
+        counts[character] = 1
+
+def find_box_problems(counts: Dict[str, int], boxes: Dict[str, List[int]],
+                      ships: List[str], sizes: List[int]) -> Dict[str, str]:
+    
+    """
+    This function returns the problems of find_fleet_problems, using the 
+    cell counts and bounding boxes built by add_to_box for every non-EMPTY 
+    character of a fleet grid.
+
+    >>> find_box_problems({'a': 2}, {'a': [0, 0, 1, 1]}, ['a'], [2])
+    {'a': 'is not in a single row or column'}
+    """
+    
+    problems = {}
+    for i in range(len(ships)):
+        count = counts.get(ships[i], 0)
+        if count != sizes[i]:
+            problems[ships[i]] = 'has {0} cells but should have {1}'.format(
+                count, sizes[i])
+        elif count > 0:
+            box = boxes[ships[i]]
+            height = box[2] - box[0] + 1
+            width = box[3] - box[1] + 1
+            # A full one-cell-wide box means the ship is a contiguous line
+            if height != 1 and width != 1:
+                problems[ships[i]] = 'is not in a single row or column'
+            elif height * width != count:
+                problems[ships[i]] = 'has a gap between its cells'
+
+    for character in counts:
+        if character not in ships:
+            problems[character] = 'is not a ship in this game'
+
+    return problems
 
 def is_valid_cell(row, col, grid_size):
     
@@ -0,0 +1,285 @@
+"""Timing benchmarks for the hot paths of the game, with stored baselines.
+
+Each case times one of has_ship, validate_fleet_grid, generate_fleet_grid,
+make_computer_move or make_move on a grid size from 3 to 10 and a fleet
+density from sparse to near-full, and reports the best time per call over
+several runs. Results can be saved as a JSON baseline and later compared
+with it; a case more than --tolerance slower than its baseline is a
+regression.
+
+    python benchmarks.py --save baseline.json
+    python benchmarks.py --compare baseline.json --tolerance 0.25
+"""
+
+import argparse
+import contextlib
+import fnmatch
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+import battleship_functions as bf
+import computer_functions as cf
+import play_battleship as pb
+
+GRID_SIZES = [3, 4, 5, 6, 7, 8, 9, 10]
+
+# The fraction of the grid covered by ships for each density
+DENSITIES = {'sparse': 0.15, 'medium': 0.4, 'dense': 0.7, 'near-full': 0.9}
+
+SHIP_CHARACTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def make_fleet(grid_size: int, density: float) -> List[List]:
+    """
+    Return [ships, sizes] for a fleet covering about density of a grid_size
+    grid. Ship sizes cycle from 5 (or grid_size, if smaller) down to 2, and
+    the last ship takes whatever cells are left.
+
+    >>> make_fleet(3, 0.9)
+    [['a', 'b', 'c'], [3, 2, 3]]
+    >>> make_fleet(10, 0.15)
+    [['a', 'b', 'c', 'd', 'e'], [5, 4, 3, 2, 1]]
+    """
+
+    cells = max(1, int(density * grid_size * grid_size))
+    cycle = list(range(min(grid_size, 5), 1, -1)) or [1]
+    sizes = []
+    while cells > 0 and len(sizes) < len(SHIP_CHARACTERS):
+        size = min(cycle[len(sizes) % len(cycle)], cells)
+        sizes.append(size)
+        cells = cells - size
+    return [list(SHIP_CHARACTERS[:len(sizes)]), sizes]
+
+
+def _make_game(grid_size: int, density: float, seed: int) -> List:
+    """
+    Return [ships, sizes, fleet_grid] for a generated game.
+    """
+
+    ships, sizes = make_fleet(grid_size, density)
+    random.seed(seed)
+    return [ships, sizes, cf.generate_fleet_grid(grid_size, ships, sizes)]
+
+
+def _ship_starts(fleet_grid: List[List[str]], ships: List[str]) -> List:
+    """
+    Return the [row, col] of the first cell of each ship in fleet_grid.
+    """
+
+    starts = {}
+    for row in range(len(fleet_grid)):
+        for col in range(len(fleet_grid)):
+            if fleet_grid[row][col] not in starts:
+                starts[fleet_grid[row][col]] = [row, col]
+    return [starts[ship] for ship in ships]
+
+
+def bench_has_ship(grid_size: int, density: float) -> List[Callable]:
+    """
+    Return [setup, run] for has_ship at the start of every ship.
+    """
+
+    ships, sizes, fleet_grid = _make_game(grid_size, density, 0)
+    starts = _ship_starts(fleet_grid, ships)
+
+    def run(state: None) -> int:
+        for i in range(len(ships)):
+            bf.has_ship(fleet_grid, starts[i][0], starts[i][1], ships[i],
+                        sizes[i])
+        return len(ships)
+
+    return [lambda: None, run]
+
+
+def bench_validate_fleet_grid(grid_size: int,
+                              density: float) -> List[Callable]:
+    """
+    Return [setup, run] for validate_fleet_grid on a generated grid.
+    """
+
+    ships, sizes, fleet_grid = _make_game(grid_size, density, 0)
+
+    def run(state: None) -> int:
+        bf.validate_fleet_grid(fleet_grid, ships, sizes)
+        return 1
+
+    return [lambda: None, run]
+
+
+def bench_generate_fleet_grid(grid_size: int,
+                              density: float) -> List[Callable]:
+    """
+    Return [setup, run] for generate_fleet_grid with a fixed seed.
+    """
+
+    ships, sizes = make_fleet(grid_size, density)
+
+    def run(state: None) -> int:
+        random.seed(1)
+        cf.generate_fleet_grid(grid_size, ships, sizes)
+        return 1
+
+    return [lambda: None, run]
+
+
+def bench_make_computer_move(grid_size: int,
+                             density: float) -> List[Callable]:
+    """
+    Return [setup, run] for make_computer_move on a target grid where the
+    fraction density of the cells has been shot.
+    """
+
+    target_grid = pb.get_target_grid(grid_size)
+    random.seed(0)
+    cells = [[row, col] for row in range(grid_size)
+             for col in range(grid_size)]
+    shot = random.sample(cells, min(int(density * len(cells)),
+                                    len(cells) - 1))
+    for row, col in shot:
+        target_grid[row][col] = bf.MISS
+
+    def run(state: None) -> int:
+        random.seed(2)
+        for _ in range(20):
+            cf.make_computer_move(target_grid)
+        return 20
+
+    return [lambda: None, run]
+
+
+def bench_make_move(grid_size: int, density: float) -> List[Callable]:
+    """
+    Return [setup, run] for make_move on every cell of a fresh game.
+    """
+
+    ships, sizes, fleet_grid = _make_game(grid_size, density, 0)
+
+    def setup() -> List:
+        return [[row[:] for row in fleet_grid], pb.get_target_grid(grid_size),
+                [0] * len(sizes)]
+
+    def run(state: List) -> int:
+        grid, target_grid, hits_list = state
+        for row in range(grid_size):
+            for col in range(grid_size):
+                pb.make_move(row, col, grid, ships, sizes, hits_list,
+                             target_grid)
+        return grid_size * grid_size
+
+    return [setup, run]
+
+
+BENCHMARKS = {
+    'has_ship': bench_has_ship,
+    'validate_fleet_grid': bench_validate_fleet_grid,
+    'generate_fleet_grid': bench_generate_fleet_grid,
+    'make_computer_move': bench_make_computer_move,
+    'make_move': bench_make_move,
+}
+
+
+def time_case(setup: Callable, run: Callable, repeat: int,
+              min_seconds: float) -> float:
+    """
+    Return the best seconds per call of run over repeat timings, each
+    running run(setup()) until at least min_seconds have passed. Only run
+    is timed.
+    """
+
+    best = None
+    for _ in range(repeat):
+        calls = 0
+        elapsed = 0.0
+        while elapsed < min_seconds:
+            state = setup()
+            start = time.perf_counter()
+            calls += run(state)
+            elapsed += time.perf_counter() - start
+        if best is None or elapsed / calls < best:
+            best = elapsed / calls
+    return best
+
+
+def run_benchmarks(pattern: str = '*', repeat: int = 5,
+                   min_seconds: float = 0.02) -> Dict[str, float]:
+    """
+    Return the best seconds per call of every case whose name matches
+    pattern. Case names look like 'make_move/n=10/dense'.
+    """
+
+    results = {}
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        for name in BENCHMARKS:
+            for grid_size in GRID_SIZES:
+                for density in DENSITIES:
+                    case = '{0}/n={1}/{2}'.format(name, grid_size, density)
+                    if fnmatch.fnmatch(case, pattern):
+                        setup, run = BENCHMARKS[name](grid_size,
+                                                      DENSITIES[density])
+                        results[case] = time_case(setup, run, repeat,
+                                                  min_seconds)
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float],
+            tolerance: float) -> List[str]:
+    """
+    Return the names of the cases in both results and baseline that are
+    more than tolerance (a fraction) slower than the baseline.
+
+    >>> compare({'a': 1.3, 'b': 1.1, 'c': 9.0}, {'a': 1.0, 'b': 1.0}, 0.25)
+    ['a']
+    """
+
+    return [case for case in results if case in baseline and
+            results[case] > baseline[case] * (1 + tolerance)]
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Run the benchmarks with the command line arguments argv, and return the
+    exit status: 1 if a regression was found and 0 otherwise.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filter', default='*',
+                        help='only run the cases matching this pattern')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-seconds', type=float, default=0.02,
+                        help='minimum time of each timing run')
+    parser.add_argument('--save', help='write the results to this baseline')
+    parser.add_argument('--compare', help='baseline to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown, as a fraction')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.filter, args.repeat, args.min_seconds)
+
+    baseline = {}
+    if args.compare is not None:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    regressions = compare(results, baseline, args.tolerance)
+
+    for case in results:
+        line = '{0:45} {1:12.3f} us'.format(case, results[case] * 1e6)
+        if case in baseline:
+            line += '  {0:+7.1%}'.format(results[case] / baseline[case] - 1)
+            if case in regressions:
+                line += '  REGRESSION'
+        print(line)
+
+    if args.save is not None:
+        with open(args.save, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
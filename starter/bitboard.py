@@ -0,0 +1,385 @@
+"""Bitboard representation of fleet and target grids.
+
+A grid_size by grid_size grid is stored as Python ints, where the cell at
+(row, col) is bit row * grid_size + col. A fleet keeps one mask per ship and
+a mask of the cells that have been hit; a target grid keeps a hit mask and a
+miss mask.
+"""
+
+import functools
+from typing import Dict, FrozenSet, List, Tuple
+
+import battleship_functions as bf
+
+
+def cell_bit(row: int, col: int, grid_size: int) -> int:
+    """
+    Return the mask with only the bit for the cell at row and col set.
+
+    >>> cell_bit(0, 0, 3)
+    1
+    >>> cell_bit(1, 2, 3)
+    32
+    """
+
+    return 1 << (row * grid_size + col)
+
+
+def count_bits(mask: int) -> int:
+    """
+    Return the number of set bits in mask.
+
+    >>> count_bits(0b10110)
+    3
+    """
+
+    return bin(mask).count('1')
+
+
+def line_mask(row: int, col: int, length: int, vertical: bool,
+              grid_size: int) -> int:
+    """
+    Return the mask of the length cells starting at row and col, going down
+    if vertical is True and right otherwise. The cells must fit in the grid.
+
+    >>> bin(line_mask(0, 1, 2, False, 3))
+    '0b110'
+    >>> bin(line_mask(0, 1, 2, True, 3))
+    '0b10010'
+    """
+
+    if vertical:
+        step = grid_size
+    else:
+        step = 1
+    start = row * grid_size + col
+    mask = 0
+    for i in range(length):
+        mask |= 1 << (start + i * step)
+    return mask
+
+
+@functools.lru_cache(maxsize=256)
+def placement_table(grid_size: int, ship_size: int) -> Tuple[tuple, ...]:
+    """
+    Return every placement of a ship with ship_size on a grid_size grid, as
+    (mask, start_row, start_col, end_row, end_col) tuples: first the
+    horizontal placements, then the vertical ones. The table is computed
+    once for each grid_size and ship_size.
+
+    >>> placement_table(2, 2)
+    ((3, 0, 0, 0, 1), (12, 1, 0, 1, 1), (5, 0, 0, 1, 0), (10, 0, 1, 1, 1))
+    """
+
+    placements = []
+    for row in range(grid_size):
+        for col in range(grid_size - ship_size + 1):
+            mask = line_mask(row, col, ship_size, False, grid_size)
+            placements.append((mask, row, col, row, col + ship_size - 1))
+    if ship_size > 1:
+        for row in range(grid_size - ship_size + 1):
+            for col in range(grid_size):
+                mask = line_mask(row, col, ship_size, True, grid_size)
+                placements.append((mask, row, col, row + ship_size - 1, col))
+    return tuple(placements)
+
+
+@functools.lru_cache(maxsize=256)
+def placement_masks(grid_size: int, ship_size: int) -> FrozenSet[int]:
+    """
+    Return the set of the masks in placement_table(grid_size, ship_size). A
+    mask is in the set iff it has exactly ship_size consecutive cells in a
+    single row or column, so checking a ship is one set lookup.
+
+    >>> sorted(placement_masks(2, 2))
+    [3, 5, 10, 12]
+    >>> 0b1001 in placement_masks(2, 2)
+    False
+    """
+
+    return frozenset(placement[0]
+                     for placement in placement_table(grid_size, ship_size))
+
+
+@functools.lru_cache(maxsize=256)
+def segment_masks(grid_size: int, ship_size: int) -> Dict[tuple, int]:
+    """
+    Return a dictionary that maps (start_row, start_col, vertical) of every
+    placement in placement_table(grid_size, ship_size) to its mask. The
+    dictionary is shared between calls and must not be changed.
+
+    >>> segment_masks(2, 2)[(0, 1, True)]
+    10
+    >>> (1, 1, True) in segment_masks(2, 2)
+    False
+    """
+
+    masks = {}
+    for mask, start_row, start_col, end_row, _ in placement_table(
+            grid_size, ship_size):
+        masks[(start_row, start_col, end_row != start_row)] = mask
+    if ship_size == 1:
+        for mask, start_row, start_col, _, _ in placement_table(grid_size, 1):
+            masks[(start_row, start_col, True)] = mask
+    return masks
+
+
+class FleetBitboard:
+    """A fleet grid with one bitmask per ship and a mask of hit cells.
+
+    === Attributes ===
+    grid_size: the number of rows (and columns) of the grid
+    ships: the ship characters, in the order of the game file
+    ship_masks: ship_masks[i] has the cells occupied by ships[i]
+    hit_mask: the ship cells that have been hit
+    """
+
+    def __init__(self, grid_size: int, ships: List[str],
+                 ship_masks: List[int], hit_mask: int = 0) -> None:
+        self.grid_size = grid_size
+        self.ships = ships
+        self.ship_masks = ship_masks
+        self.hit_mask = hit_mask
+
+    def occupied_mask(self) -> int:
+        """
+        Return the mask of every cell that contains a ship.
+        """
+
+        occupied = 0
+        for mask in self.ship_masks:
+            occupied |= mask
+        return occupied
+
+    def hits_list(self) -> List[int]:
+        """
+        Return the number of hits on each ship, in the order of ships.
+        """
+
+        return [count_bits(mask & self.hit_mask) for mask in self.ship_masks]
+
+
+class TargetBitboard:
+    """A target grid with a mask of HIT cells and a mask of MISS cells.
+
+    === Attributes ===
+    grid_size: the number of rows (and columns) of the grid
+    hit_mask: the cells that are HIT
+    miss_mask: the cells that are MISS
+    """
+
+    def __init__(self, grid_size: int, hit_mask: int = 0,
+                 miss_mask: int = 0) -> None:
+        self.grid_size = grid_size
+        self.hit_mask = hit_mask
+        self.miss_mask = miss_mask
+
+    def shot_mask(self) -> int:
+        """
+        Return the mask of every cell that is not UNKNOWN.
+        """
+
+        return self.hit_mask | self.miss_mask
+
+
+def fleet_grid_to_bitboard(fleet_grid: List[List[str]],
+                           ships: List[str]) -> FleetBitboard:
+    """
+    Return the FleetBitboard for fleet_grid with ship characters ships.
+    Upper-case ship characters are recorded as hit cells. Characters that are
+    neither EMPTY nor a ship are ignored.
+
+    >>> fleet = fleet_grid_to_bitboard([['.', 'b'], ['a', 'B']], ['a', 'b'])
+    >>> [bin(mask) for mask in fleet.ship_masks]
+    ['0b100', '0b1010']
+    >>> bin(fleet.hit_mask)
+    '0b1000'
+    """
+
+    grid_size = len(fleet_grid)
+    ship_index = {}
+    for i in range(len(ships)):
+        ship_index[ships[i]] = i
+    ship_masks = [0] * len(ships)
+    hit_mask = 0
+
+    bit = 1
+    for row in fleet_grid:
+        for cell in row:
+            if cell in ship_index:
+                ship_masks[ship_index[cell]] |= bit
+            elif cell.lower() in ship_index:
+                ship_masks[ship_index[cell.lower()]] |= bit
+                hit_mask |= bit
+            bit <<= 1
+
+    return FleetBitboard(grid_size, ships, ship_masks, hit_mask)
+
+
+def bitboard_to_fleet_grid(fleet: FleetBitboard) -> List[List[str]]:
+    """
+    Return the fleet grid for fleet, with hit ship cells in upper-case.
+
+    >>> fleet = FleetBitboard(2, ['a', 'b'], [0b100, 0b1010], 0b1000)
+    >>> bitboard_to_fleet_grid(fleet)
+    [['.', 'b'], ['a', 'B']]
+    """
+
+    size = fleet.grid_size
+    cells = [bf.EMPTY] * (size * size)
+    for i in range(len(fleet.ships)):
+        mask = fleet.ship_masks[i]
+        while mask:
+            low = mask & -mask
+            index = low.bit_length() - 1
+            if fleet.hit_mask & low:
+                cells[index] = fleet.ships[i].upper()
+            else:
+                cells[index] = fleet.ships[i]
+            mask ^= low
+
+    return [cells[row * size:(row + 1) * size] for row in range(size)]
+
+
+def target_grid_to_bitboard(target_grid: List[List[str]]) -> TargetBitboard:
+    """
+    Return the TargetBitboard for target_grid.
+
+    >>> target = target_grid_to_bitboard([['M', '-'], ['-', 'X']])
+    >>> bin(target.hit_mask), bin(target.miss_mask)
+    ('0b1000', '0b1')
+    """
+
+    hit_mask = 0
+    miss_mask = 0
+    bit = 1
+    for row in target_grid:
+        for cell in row:
+            if cell == bf.HIT:
+                hit_mask |= bit
+            elif cell == bf.MISS:
+                miss_mask |= bit
+            bit <<= 1
+
+    return TargetBitboard(len(target_grid), hit_mask, miss_mask)
+
+
+def bitboard_to_target_grid(target: TargetBitboard) -> List[List[str]]:
+    """
+    Return the target grid for target.
+
+    >>> bitboard_to_target_grid(TargetBitboard(2, 0b1000, 0b1))
+    [['M', '-'], ['-', 'X']]
+    """
+
+    size = target.grid_size
+    grid = []
+    bit = 1
+    for row in range(size):
+        grid.append([])
+        for col in range(size):
+            if target.hit_mask & bit:
+                grid[row].append(bf.HIT)
+            elif target.miss_mask & bit:
+                grid[row].append(bf.MISS)
+            else:
+                grid[row].append(bf.UNKNOWN)
+            bit <<= 1
+
+    return grid
+
+
+def make_move(row: int, col: int, fleet: FleetBitboard, sizes: List[int],
+              target: TargetBitboard) -> str:
+    """
+    Return 'hit a ship' and update fleet, using sizes to report a sunk ship,
+    if there is a ship at row and col, or return 'missed' if there is no ship
+    at row and col. Update target in both cases.
+
+    This is the bitboard version of play_battleship.make_move.
+
+    >>> fleet = fleet_grid_to_bitboard([['.', 'a'], ['.', 'a']], ['a'])
+    >>> target = TargetBitboard(2)
+    >>> make_move(0, 0, fleet, [2], target)
+    'missed'
+    >>> make_move(0, 1, fleet, [2], target)
+    'hit a ship'
+    >>> bitboard_to_target_grid(target)
+    [['M', 'X'], ['-', '-']]
+    >>> bitboard_to_fleet_grid(fleet)
+    [['.', 'A'], ['.', 'a']]
+    """
+
+    bit = cell_bit(row, col, fleet.grid_size)
+    for i in range(len(fleet.ship_masks)):
+        if fleet.ship_masks[i] & bit:
+            fleet.hit_mask |= bit
+            target.hit_mask |= bit
+            if count_bits(fleet.ship_masks[i] & fleet.hit_mask) == sizes[i]:
+                bf.print_sunk_message(sizes[i], fleet.ships[i])
+            return 'hit a ship'
+
+    target.miss_mask |= bit
+    return 'missed'
+
+
+def is_win(fleet: FleetBitboard) -> bool:
+    """
+    Return True iff every ship cell in fleet has been hit.
+
+    >>> is_win(FleetBitboard(2, ['a'], [0b1010], 0b1010))
+    True
+    >>> is_win(FleetBitboard(2, ['a'], [0b1010], 0b10))
+    False
+    """
+
+    return fleet.occupied_mask() & ~fleet.hit_mask == 0
+
+
+def validate_fleet_grid(fleet: FleetBitboard, sizes: List[int],
+                        empty_count: int) -> bool:
+    """
+    Return True iff fleet is a valid fleet grid for the game with ship sizes
+    sizes, where empty_count is the number of EMPTY cells in the grid. Each
+    ship is checked against placement_masks, as in
+    battleship_functions.find_fleet_problems.
+
+    >>> grid = [['.', 'b', '.'], ['.', 'b', '.'], ['a', 'a', 'a']]
+    >>> fleet = fleet_grid_to_bitboard(grid, ['a', 'b'])
+    >>> validate_fleet_grid(fleet, [3, 2], 4)
+    True
+    >>> grid = [['.', '.', 'b'], ['.', 'b', '.'], ['a', 'a', 'a']]
+    >>> fleet = fleet_grid_to_bitboard(grid, ['a', 'b'])
+    >>> validate_fleet_grid(fleet, [3, 2], 4)
+    False
+    """
+
+    if fleet.grid_size * fleet.grid_size != empty_count + sum(sizes):
+        return False
+
+    for i in range(len(fleet.ship_masks)):
+        mask = fleet.ship_masks[i]
+        if mask == 0 or mask not in placement_masks(fleet.grid_size,
+                                                    sizes[i]):
+            return False
+
+    return True
+
+
+def count_empty(fleet_grid: List[List[str]]) -> int:
+    """
+    Return the number of EMPTY cells in fleet_grid.
+
+    >>> count_empty([['.', 'b'], ['a', '.']])
+    2
+    """
+
+    total = 0
+    for row in fleet_grid:
+        total += row.count(bf.EMPTY)
+    return total
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
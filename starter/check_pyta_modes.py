@@ -0,0 +1,190 @@
+"""Check that python_ta's batch, parallel and cache modes match a serial run.
+
+Each mode lints the same files with python_ta.check_all in a fresh Python
+process, and its report is compared line by line with that of a serial run.
+The "[INFO] Loaded configuration file" lines are left out, since how many
+there are depends on how many linters a mode builds. The cache modes run
+twice with an empty cache directory, so that both a run that fills the
+cache and one that replays it are compared. Besides the files given, every
+run lints SAMPLE_SOURCE, whose nodes (an async function is a FunctionDef
+subclass) must render the same however the messages reach the reporter.
+
+The bundled python_ta needs Python 3.7:
+
+    python3.7 check_pyta_modes.py battleship_functions.py game_state.py
+"""
+
+import argparse
+import difflib
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_PYTA_DIR = os.path.join(HERE, 'new_pyta')
+
+# The modes compared with a serial run, in the order they are run. The cache
+# modes appear twice: the first run fills the cache, the second replays it.
+MODES = ['batch', 'parallel', 'cache', 'cache', 'parallel-cache',
+         'parallel-cache']
+
+INFO_PREFIX = '[INFO] Loaded configuration file'
+
+# Linted in every run, for the messages whose rendering depends on the type
+# of their node
+SAMPLE_SOURCE = '''import asyncio
+
+
+class Fetcher:
+    async def fetch(self, x: int) -> int:
+        await asyncio.sleep(0)
+        return x
+
+
+async def fetch(x: int) -> int:
+    return x
+
+
+def double(x):
+    return x * 2
+'''
+
+
+def mode_options(mode: str, cache_dir: str) -> Dict:
+    """
+    Return the check_all keyword arguments for mode, with cache_dir as the
+    cache directory.
+
+    >>> mode_options('serial', 'c')
+    {}
+    >>> mode_options('parallel-cache', 'c')
+    {'parallel': True, 'processes': 2, 'cache': 'c'}
+    """
+
+    options = {}
+    if mode == 'batch':
+        options['batch'] = True
+    if mode.startswith('parallel'):
+        options['parallel'] = True
+        options['processes'] = 2
+    if mode.endswith('cache'):
+        options['cache'] = cache_dir
+    return options
+
+
+def report_lines(output: str) -> List[str]:
+    """
+    Return the lines of the python_ta output output, without the lines
+    saying which configuration file was loaded.
+
+    >>> report_lines('[INFO] Loaded configuration file: a\\nC0301 x\\n\\n')
+    ['C0301 x', '']
+    """
+
+    return [line for line in output.splitlines()
+            if not line.startswith(INFO_PREFIX)]
+
+
+def run_mode(mode: str, files: List[str], reporter: str, cache_dir: str,
+             pyta_dir: str) -> subprocess.CompletedProcess:
+    """
+    Return the finished process that lints files in mode with reporter,
+    importing python_ta from pyta_dir.
+    """
+
+    command = [sys.executable, os.path.abspath(__file__), '--run', mode,
+               '--reporter', reporter, '--cache-dir', cache_dir,
+               '--pyta-dir', pyta_dir] + files
+    return subprocess.run(command, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, universal_newlines=True)
+
+
+def lint(mode: str, files: List[str], reporter: str, cache_dir: str,
+         pyta_dir: str) -> None:
+    """
+    Lint files with python_ta.check_all in mode, with reporter.
+    """
+
+    sys.path.insert(0, pyta_dir)
+    import python_ta
+    python_ta.check_all(files, config={'pyta-reporter': reporter},
+                        **mode_options(mode, cache_dir))
+
+
+def compare_modes(files: List[str], reporter: str,
+                  pyta_dir: str) -> List[str]:
+    """
+    Return the problems found when comparing each of MODES with a serial
+    run on files and SAMPLE_SOURCE with reporter: for each mode that
+    reported something else, its name and a diff of the reports. Raise
+    RuntimeError if the serial run fails.
+    """
+
+    problems = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        sample = os.path.join(cache_dir, 'pyta_modes_sample.py')
+        with open(sample, 'w') as sample_file:
+            sample_file.write(SAMPLE_SOURCE)
+        files = files + [sample]
+        serial = run_mode('serial', files, reporter, cache_dir, pyta_dir)
+        if serial.returncode != 0:
+            raise RuntimeError('the serial run failed: {0}'.format(
+                (serial.stderr.strip().splitlines() or ['no output'])[-1]))
+        expected = report_lines(serial.stdout)
+
+        for mode in MODES:
+            process = run_mode(mode, files, reporter, cache_dir, pyta_dir)
+            actual = report_lines(process.stdout)
+            if process.returncode != 0:
+                problems.append('{0}: exited with {1}\n{2}'.format(
+                    mode, process.returncode, process.stderr))
+            elif actual != expected:
+                diff = difflib.unified_diff(expected, actual, 'serial', mode,
+                                            lineterm='')
+                problems.append('{0}:\n{1}'.format(mode, '\n'.join(diff)))
+    return problems
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Compare the modes with the command line arguments argv, print the
+    result and return the exit code: 0 if every mode matched the serial run,
+    1 if one did not, or 2 if python_ta could not be run.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*',
+                        default=[os.path.join(HERE, 'battleship_functions.py')])
+    parser.add_argument('--reporter', default='PlainReporter')
+    parser.add_argument('--pyta-dir', default=DEFAULT_PYTA_DIR,
+                        help='the directory to import python_ta from')
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    parser.add_argument('--cache-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    files = [os.path.abspath(name) for name in args.files]
+
+    if args.run is not None:
+        lint(args.run, files, args.reporter, args.cache_dir, args.pyta_dir)
+        return 0
+
+    try:
+        problems = compare_modes(files, args.reporter, args.pyta_dir)
+    except RuntimeError as error:
+        print('Could not run python_ta with {0}: {1}'.format(
+            sys.executable, error))
+        return 2
+
+    for problem in problems:
+        print(problem)
+    if problems:
+        return 1
+    print('{0} matched the serial run with {1}.'.format(
+        ', '.join(sorted(set(MODES))), args.reporter))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
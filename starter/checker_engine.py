@@ -0,0 +1,494 @@
+"""The checks of a2_checker.py as a reusable engine with structured results.
+
+run_checks lints battleship_functions.py with python_ta, type checks each
+function and checks that no function changed the constants, and returns
+one result per check instead of stopping at the first failure:
+
+    {'name': 'has_ship', 'kind': 'type', 'status': 'pass', 'message': '',
+     'seconds': 0.0001}
+
+A status is 'pass', 'fail', 'error' (the check raised something other
+than AssertionError) or 'timeout'. The lint result is cached in a JSON file,
+keyed by a hash of the checked file and the config file, so it is only
+redone after either changes. The type checks run in parallel worker
+processes, each with a time limit.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SOURCE = os.path.join(HERE, 'battleship_functions.py')
+DEFAULT_CONFIG = os.path.join(HERE, 'new_pyta', 'a2_pyta.txt')
+DEFAULT_CACHE = os.path.join(HERE, '.a2_checker_cache.json')
+
+# The values of MIN_SHIP_SIZE, MAX_SHIP_SIZE, UNKNOWN, EMPTY, HIT and MISS
+CONSTANTS = [1, 10, '-', '.', 'X', 'M']
+
+PASS = 'pass'
+FAIL = 'fail'
+ERROR = 'error'
+TIMEOUT = 'timeout'
+
+
+def _returned(function: str, expected: str, result: object) -> str:
+    """
+    Return the message for function returning result instead of expected.
+    """
+
+    return 'bf.{0} should return {1}, but returned {2}.'.format(
+        function, expected, type(result))
+
+
+def check_read_ship_data(bf: object) -> None:
+    """
+    Check that bf.read_ship_data returns a list of a list of str and a list
+    of int.
+    """
+
+    result = bf.read_ship_data(io.StringIO('t\n1\nt'))
+    assert isinstance(result, list), _returned('read_ship_data', 'a list',
+                                               result)
+    assert isinstance(result[0][0], str), \
+        'bf.read_ship_data should return a list where the first element ' \
+        'is a list of str, but the first element is a list of {0}.'.format(
+            type(result[0][0]))
+    assert isinstance(result[1][0], int), \
+        'bf.read_ship_data should return a list where the second element ' \
+        'is a list of int, but the second element is a list of {0}.'.format(
+            type(result[1][0]))
+
+
+def check_has_ship(bf: object) -> None:
+    """
+    Check that bf.has_ship returns a bool.
+    """
+
+    fleet_grid = [['a', 'a', 'a'], ['b', 'b', '.'], ['.', '.', '.']]
+    result = bf.has_ship(fleet_grid, 0, 0, 'a', 3)
+    assert isinstance(result, bool), _returned('has_ship', 'a bool', result)
+
+
+def check_validate_character_count(bf: object) -> None:
+    """
+    Check that bf.validate_character_count returns a bool.
+    """
+
+    fleet_grid = [['a', 'a', 'a'], ['b', 'b', '.'], ['.', '.', '.']]
+    result = bf.validate_character_count(fleet_grid, ['a', 'b'], [3, 2])
+    assert isinstance(result, bool), _returned('validate_character_count',
+                                               'a bool', result)
+
+
+def check_validate_ship_positions(bf: object) -> None:
+    """
+    Check that bf.validate_ship_positions returns a bool.
+    """
+
+    fleet_grid = [['a', 'a', 'a'], ['b', 'b', '.'], ['.', '.', '.']]
+    result = bf.validate_ship_positions(fleet_grid, ['a', 'b'], [3, 2])
+    assert isinstance(result, bool), _returned('validate_ship_positions',
+                                               'a bool', result)
+
+
+def check_validate_fleet_grid(bf: object) -> None:
+    """
+    Check that bf.validate_fleet_grid returns a bool.
+    """
+
+    fleet_grid = [['a', 'a', 'a'], ['b', 'b', '.'], ['.', '.', '.']]
+    result = bf.validate_fleet_grid(fleet_grid, ['a', 'b'], [3, 2])
+    assert isinstance(result, bool), _returned('validate_fleet_grid',
+                                               'a bool', result)
+
+
+def check_is_valid_cell(bf: object) -> None:
+    """
+    Check that bf.is_valid_cell returns a bool.
+    """
+
+    result = bf.is_valid_cell(1, 1, 3)
+    assert isinstance(result, bool), _returned('is_valid_cell', 'a bool',
+                                               result)
+
+
+def check_is_not_given_char(bf: object) -> None:
+    """
+    Check that bf.is_not_given_char returns a bool.
+    """
+
+    result = bf.is_not_given_char(1, 1, [['a', '-'], ['-', 'b']], '-')
+    assert isinstance(result, bool), _returned('is_not_given_char', 'a bool',
+                                               result)
+
+
+def check_update_fleet_grid(bf: object) -> None:
+    """
+    Check that bf.update_fleet_grid returns None.
+    """
+
+    result = bf.update_fleet_grid(0, 1, [['.', 'a'], ['.', 'a']], ['a'], [2],
+                                  [0])
+    assert result is None, _returned('update_fleet_grid', 'None', result)
+
+
+def check_update_target_grid(bf: object) -> None:
+    """
+    Check that bf.update_target_grid returns None.
+    """
+
+    target_grid = [['-', '-', '-'], ['-', '-', '-'], ['-', '-', '-']]
+    fleet_grid = [['.', '.', '.'], ['.', '.', '.'], ['.', '.', '.']]
+    result = bf.update_target_grid(0, 0, target_grid, fleet_grid)
+    assert result is None, _returned('update_target_grid', 'None', result)
+
+
+def check_is_win(bf: object) -> None:
+    """
+    Check that bf.is_win returns a bool.
+    """
+
+    result = bf.is_win([1, 2, 3], [1, 2, 3])
+    assert isinstance(result, bool), _returned('is_win', 'a bool', result)
+
+
+# The type checks, in the order a2_checker.py ran them
+TYPE_CHECKS = [
+    ['read_ship_data', check_read_ship_data],
+    ['has_ship', check_has_ship],
+    ['validate_character_count', check_validate_character_count],
+    ['validate_ship_positions', check_validate_ship_positions],
+    ['validate_fleet_grid', check_validate_fleet_grid],
+    ['is_valid_cell', check_is_valid_cell],
+    ['is_not_given_char', check_is_not_given_char],
+    ['update_fleet_grid', check_update_fleet_grid],
+    ['update_target_grid', check_update_target_grid],
+    ['is_win', check_is_win],
+]  # type: List[List]
+
+
+def _constants(bf: object) -> List:
+    """
+    Return the current values of the constants of bf, in CONSTANTS order.
+    """
+
+    return [bf.MIN_SHIP_SIZE, bf.MAX_SHIP_SIZE, bf.UNKNOWN, bf.EMPTY, bf.HIT,
+            bf.MISS]
+
+
+def _result(name: str, kind: str, status: str, message: str = '',
+            seconds: float = 0.0) -> Dict:
+    """
+    Return a check result.
+    """
+
+    return {'name': name, 'kind': kind, 'status': status, 'message': message,
+            'seconds': round(seconds, 6)}
+
+
+def run_type_check(index: int) -> Dict:
+    """
+    Run TYPE_CHECKS[index] against battleship_functions, with its output
+    discarded, and return its result. The result also says whether the
+    constants had the values in CONSTANTS after the check.
+    """
+
+    import battleship_functions as bf
+
+    name, check = TYPE_CHECKS[index]
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        try:
+            check(bf)
+            result = _result(name, 'type', PASS)
+        except AssertionError as error:
+            result = _result(name, 'type', FAIL, str(error))
+        except Exception as error:
+            result = _result(name, 'type', ERROR, '{0}: {1}'.format(
+                type(error).__name__, error))
+    result['seconds'] = round(time.perf_counter() - start, 6)
+    result['constants_unchanged'] = _constants(bf) == CONSTANTS
+    return result
+
+
+def _init_worker(source_dir: str) -> None:
+    """
+    Make the battleship_functions in source_dir importable in a worker.
+    """
+
+    sys.path.insert(0, source_dir)
+
+
+def _run_worker(index: int, source_dir: str,
+                connection: multiprocessing.connection.Connection) -> None:
+    """
+    Run TYPE_CHECKS[index] against the battleship_functions in source_dir
+    and send its result through connection.
+    """
+
+    _init_worker(source_dir)
+    connection.send(run_type_check(index))
+    connection.close()
+
+
+def run_type_checks(source: str = DEFAULT_SOURCE, timeout: float = 5.0,
+                    processes: int = None) -> List[Dict]:
+    """
+    Run every type check against the battleship_functions.py at source in
+    its own worker process, with at most processes workers at a time (one
+    per check by default), and return their results in TYPE_CHECKS order.
+    A check that has not finished timeout seconds after its worker started
+    is reported as a timeout, and its worker is stopped, so checks waiting
+    for a worker are not charged for the time they waited. Each worker runs
+    a single check, so a constant changed by one check cannot be blamed on
+    another. Raise ValueError if processes is less than 1.
+    """
+
+    if processes is None:
+        processes = len(TYPE_CHECKS)
+    if processes < 1:
+        raise ValueError('processes must be at least 1, not {0}'.format(
+            processes))
+    source_dir = os.path.dirname(os.path.abspath(source))
+    results = [None] * len(TYPE_CHECKS)  # type: List[Dict]
+    waiting = list(range(len(TYPE_CHECKS)))
+    # Maps the index of each running check to its worker, the end of the
+    # connection its result arrives on, and its deadline
+    running = {}  # type: Dict[int, List]
+    try:
+        while waiting or running:
+            while waiting and len(running) < processes:
+                index = waiting.pop(0)
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                worker = multiprocessing.Process(
+                    target=_run_worker, args=[index, source_dir, sender])
+                worker.start()
+                sender.close()
+                running[index] = [worker, receiver,
+                                  time.monotonic() + timeout]
+
+            first_deadline = min(item[2] for item in running.values())
+            ready = multiprocessing.connection.wait(
+                [item[1] for item in running.values()],
+                max(0.0, first_deadline - time.monotonic()))
+            now = time.monotonic()
+            for index in list(running):
+                worker, receiver, deadline = running[index]
+                name = TYPE_CHECKS[index][0]
+                if receiver in ready:
+                    try:
+                        results[index] = receiver.recv()
+                    except EOFError:
+                        worker.join()
+                        results[index] = _result(
+                            name, 'type', ERROR,
+                            'the worker exited with code {0}'.format(
+                                worker.exitcode))
+                elif now >= deadline:
+                    worker.terminate()
+                    results[index] = _result(
+                        name, 'type', TIMEOUT,
+                        'did not finish within {0} seconds'.format(timeout),
+                        timeout)
+                else:
+                    continue
+                worker.join()
+                receiver.close()
+                del running[index]
+    finally:
+        for worker, receiver, _ in running.values():
+            worker.terminate()
+            worker.join()
+            receiver.close()
+    return results
+
+
+def check_constants(type_results: List[Dict]) -> Dict:
+    """
+    Return the result of the constants check for the type check results
+    type_results.
+
+    >>> check_constants([{'name': 'f', 'constants_unchanged': True}])['status']
+    'pass'
+    >>> check_constants([{'name': 'f', 'constants_unchanged': False}])
+    ... # doctest: +NORMALIZE_WHITESPACE
+    {'name': 'constants', 'kind': 'constants', 'status': 'fail',
+     'message': 'The constants were changed by: f.', 'seconds': 0.0}
+    """
+
+    changed = [result['name'] for result in type_results
+               if result.get('constants_unchanged') is False]
+    if changed:
+        return _result('constants', 'constants', FAIL,
+                       'The constants were changed by: {0}.'.format(
+                           ', '.join(changed)))
+    return _result('constants', 'constants', PASS)
+
+
+def lint_key(source: str, config: str) -> str:
+    """
+    Return the cache key for linting source with config: a SHA-256 hash of
+    both files.
+    """
+
+    digest = hashlib.sha256()
+    for filename in [source, config]:
+        with open(filename, 'rb') as checked_file:
+            digest.update(checked_file.read())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def run_lint(source: str = DEFAULT_SOURCE, config: str = DEFAULT_CONFIG,
+             cache_file: str = DEFAULT_CACHE,
+             lint: Callable = None) -> Dict:
+    """
+    Return the result of linting source with python_ta.check_all and config.
+    Its status is 'pass' if python_ta ran, whatever it reported; the report
+    is in the result's 'output', and 'cached' says whether it came from
+    cache_file. Only lints that ran are cached. lint is the
+    function to lint with, python_ta.check_all by default.
+    """
+
+    key = lint_key(source, config)
+    cache = {}
+    if cache_file is not None and os.path.exists(cache_file):
+        try:
+            with open(cache_file) as cached:
+                cache = json.load(cached)
+        except ValueError:
+            cache = {}
+    if cache.get('key') == key:
+        result = cache['result']
+        result['cached'] = True
+        return result
+
+    start = time.perf_counter()
+    output = io.StringIO()
+    try:
+        if lint is None:
+            sys.path.insert(0, os.path.join(HERE, 'new_pyta'))
+            import python_ta
+            lint = python_ta.check_all
+        with contextlib.redirect_stdout(output):
+            lint(source, config=config)
+        result = _result('lint', 'lint', PASS, '',
+                         time.perf_counter() - start)
+    except Exception as error:
+        result = _result('lint', 'lint', ERROR, '{0}: {1}'.format(
+            type(error).__name__, error), time.perf_counter() - start)
+    result['output'] = output.getvalue()
+
+    if result['status'] == PASS and cache_file is not None:
+        with open(cache_file, 'w') as cached:
+            json.dump({'key': key, 'result': result}, cached)
+    result['cached'] = False
+    return result
+
+
+def run_checks(source: str = DEFAULT_SOURCE, config: str = DEFAULT_CONFIG,
+               cache_file: str = DEFAULT_CACHE, timeout: float = 5.0,
+               processes: int = None, lint: bool = True) -> List[Dict]:
+    """
+    Run every check of source and return their results: the lint (unless
+    lint is False), then the type checks in TYPE_CHECKS order, then the
+    constants check.
+    """
+
+    results = []
+    if lint:
+        results.append(run_lint(source, config, cache_file))
+    type_results = run_type_checks(source, timeout, processes)
+    results.extend(type_results)
+    results.append(check_constants(type_results))
+    return results
+
+
+# The banners a2_checker.py printed around each kind of check
+_BANNERS = {
+    'lint': ['==================== Start: checking coding style '
+             '===================',
+             '=================== End: checking coding style '
+             '===================\n'],
+    'type': ['============ Start: checking parameter and return types '
+             '============',
+             '============= End: checking parameter and return types '
+             '=============\n'],
+    'constants': ['========== Start: checking whether constants are '
+                  'unchanged ==========',
+                  '=========== End: checking whether constants are '
+                  'unchanged ==========='],
+}
+
+
+def print_results(results: List[Dict]) -> None:
+    """
+    Print results in the style of a2_checker.py.
+    """
+
+    kind = None
+    for result in results:
+        if result['kind'] != kind:
+            if kind is not None:
+                print(_BANNERS[kind][1])
+            kind = result['kind']
+            print(_BANNERS[kind][0])
+
+        if kind == 'lint':
+            if result['cached']:
+                print('[INFO] Unchanged since the last check.')
+            print(result['output'], end='')
+            if result['status'] != PASS:
+                print('[ERROR] ' + result['message'])
+            continue
+        print('Checking {0}...'.format(result['name']))
+        if result['status'] == PASS:
+            print('  check complete')
+        else:
+            print('  {0}: {1}'.format(result['status'].upper(),
+                                      result['message']))
+    if kind is not None:
+        print(_BANNERS[kind][1])
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Run the checks with the command line arguments argv, print the results
+    and return the exit status: 0 iff every check passed.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default=DEFAULT_SOURCE)
+    parser.add_argument('--config', default=DEFAULT_CONFIG)
+    parser.add_argument('--cache', default=DEFAULT_CACHE,
+                        help='lint cache file')
+    parser.add_argument('--no-lint', action='store_true')
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help='seconds each type check may take')
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as JSON')
+    args = parser.parse_args(argv)
+
+    results = run_checks(args.source, args.config, args.cache, args.timeout,
+                         args.processes, not args.no_lint)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+    return 0 if all(result['status'] == PASS for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,29 +1,249 @@
 from battleship_functions import *
+from bitboard import count_bits, placement_table
 import random
 
 from typing import List, TextIO
 
+# The number of placements generate_fleet_grid tries, times a term of the Luby
+# sequence (1, 1, 2, 1, 1, 2, 4, ...), before restarting its search in a new
+# random order
+PLACEMENT_ATTEMPTS_UNIT = 200
+
+# The most placements generate_fleet_grid tries over all its searches before
+# giving up on a fleet it could neither place nor rule out
+MAX_PLACEMENT_ATTEMPTS = 200000
+
+
+class PlacementGaveUpError(ValueError):
+    """Raised when generate_fleet_grid runs out of attempts before it can
+    either place the ships or show that they do not fit."""
+
+
 def generate_fleet_grid(grid_size: int, ships: List[str], sizes: List[int]) -> List[List[str]]:
     """
     Return a new grid_size by grid_size fleet grid with the ship symbols
     in ships and ship sizes in sizes placed randomly on the fleet grid, either
     horizontally or vertically, and the rest of the cells EMPTY.
+
+    Raise ValueError if the ships cannot all be placed on the grid, or
+    PlacementGaveUpError (a ValueError) if MAX_PLACEMENT_ATTEMPTS
+    placements were tried without finding out whether they can.
+
+    >>> grid = generate_fleet_grid(3, ['a', 'b', 'c'], [3, 3, 3])
+    >>> validate_fleet_grid(grid, ['a', 'b', 'c'], [3, 3, 3])
+    True
+    >>> generate_fleet_grid(3, ['a', 'b'], [3, 4])
+    Traceback (most recent call last):
+    ValueError: ship b of size 4 does not fit on a 3 by 3 grid
     """
     
     grid = make_empty_grid(grid_size)
-    
-    for index in range(len(ships) - 1, -1, -1):
-        # get the ship symbol and its size
-        placed = False
-        ship = ships[index]
-        ship_size = sizes[index]
 
-        while not placed:
-            placed = randomly_place_ship(grid, ship, ship_size)         
+    for index in range(len(ships)):
+        if sizes[index] > grid_size:
+            raise ValueError('ship {0} of size {1} does not fit on a {2} by '
+                             '{2} grid'.format(ships[index], sizes[index],
+                                               grid_size))
+    if sum(sizes) > grid_size * grid_size:
+        raise ValueError('ships of total size {0} do not fit on a {1} by {1} '
+                         'grid'.format(sum(sizes), grid_size))
+
+    candidates = []
+    for index in range(len(ships)):
+        candidates.append([index, sizes[index],
+                           get_placements(grid_size, sizes[index])])
+    free = (1 << (grid_size * grid_size)) - 1
+    # The states every search has shown to have no placements, which later
+    # searches skip
+    failed = set()
+    restarts = 1
+    attempts_left = [PLACEMENT_ATTEMPTS_UNIT]
+    chosen = choose_placements(candidates, free, attempts_left, failed)
+    attempts = PLACEMENT_ATTEMPTS_UNIT - attempts_left[0]
+    while chosen is None and attempts_left[0] <= 0:
+        # The search was cut off before trying every placement, so the
+        # ships may still fit: start again in a new random order
+        if attempts >= MAX_PLACEMENT_ATTEMPTS:
+            raise PlacementGaveUpError(
+                'gave up placing ships {0} with sizes {1} on a {2} by {2} '
+                'grid after {3} attempts'.format(ships, sizes, grid_size,
+                                                 attempts))
+        restarts = restarts + 1
+        budget = min(PLACEMENT_ATTEMPTS_UNIT * luby(restarts),
+                     MAX_PLACEMENT_ATTEMPTS - attempts)
+        attempts_left = [budget]
+        chosen = choose_placements(candidates, free, attempts_left, failed)
+        attempts = attempts + budget - attempts_left[0]
+    if chosen is None:
+        raise ValueError('could not place ships {0} with sizes {1} on a {2} '
+                         'by {2} grid'.format(ships, sizes, grid_size))
+
+    for index in chosen:
+        start_row, start_col, end_row, end_col = chosen[index][1:]
+        place_ship(start_row, start_col, end_row, end_col, grid, ships[index])
         
     return grid
 
 
+def luby(i: int) -> int:
+    """
+    Return term i (from 1) of the Luby sequence, the restart budgets that
+    waste the least work on a search whose run time is unknown.
+
+    >>> [luby(i) for i in range(1, 16)]
+    [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8]
+    """
+
+    k = 1
+    while (1 << k) - 1 < i:
+        k = k + 1
+    if (1 << k) - 1 == i:
+        return 1 << (k - 1)
+    return luby(i - (1 << (k - 1)) + 1)
+
+
+def get_placements(grid_size: int, ship_size: int) -> List[tuple]:
+    """
+    Return every placement of a ship with ship_size on a grid_size grid, as
+    (mask, start_row, start_col, end_row, end_col), where mask has the bits
+    row * grid_size + col of the ship's cells set. The placements come from
+    the cached bitboard.placement_table.
+
+    >>> get_placements(2, 2)
+    [(3, 0, 0, 0, 1), (12, 1, 0, 1, 1), (5, 0, 0, 1, 0), (10, 0, 1, 1, 1)]
+    """
+
+    return list(placement_table(grid_size, ship_size))
+
+
+def choose_placements(candidates: List[list], free: int,
+                      attempts_left: List[int], failed: set = None) -> dict:
+    """
+    Return a dictionary that maps the ship index of each [ship index, ship
+    size, placements] list in candidates to one of its placements, chosen
+    randomly so that no two chosen placements overlap. Return None if there
+    is no such choice, or if attempts_left[0] placements have been tried
+    without finding one (attempts_left[0] is then 0). free is the mask of
+    the cells not covered by a ship, and the placements in candidates are
+    all those of their ship size that only use free cells.
+
+    failed holds the states (free and the sorted ship sizes) found to have
+    no choice, and the states this search rules out are added to it. A
+    state is only added if its search was not cut off.
+
+    On a roomy grid, the ship with the fewest placements is placed first.
+    When the ships (nearly) fill the free cells, the free cell covered by
+    the fewest placements is decided first instead: it gets one of those
+    placements, or is left EMPTY if there is room to spare. After each
+    choice, the placements overlapping it are removed from the remaining
+    lists, and another choice is tried (backtracking) if a ship has no
+    placements left or the remaining placements cannot cover enough cells.
+    """
+
+    if len(candidates) == 0:
+        return {}
+    if failed is None:
+        failed = set()
+    state = (free, tuple(sorted(candidate[1] for candidate in candidates)))
+    if state in failed:
+        return None
+
+    needed = 0
+    smallest = candidates[0][1]
+    for candidate in candidates:
+        needed = needed + candidate[1]
+        smallest = min(smallest, candidate[1])
+    spare = count_bits(free) - needed
+
+    if spare < smallest:
+        options = get_cell_options(candidates, free, spare > 0)
+    else:
+        fewest = min(candidates, key=lambda candidate: len(candidate[2]))
+        options = [[fewest, placement] for placement in fewest[2]]
+
+    while len(options) > 0 and attempts_left[0] > 0:
+        attempts_left[0] = attempts_left[0] - 1
+        i = random.randrange(len(options))
+        candidate, placement = options[i]
+        options[i] = options[-1]
+        options.pop()
+
+        remaining = []
+        covered = 0
+        for other in candidates:
+            if other is not candidate:
+                legal = [option for option in other[2]
+                         if not option[0] & placement[0]]
+                if len(legal) == 0:
+                    break
+                for option in legal:
+                    covered = covered | option[0]
+                remaining.append([other[0], other[1], legal])
+
+        if candidate is None:
+            still_needed = needed
+        else:
+            still_needed = needed - candidate[1]
+        if len(remaining) == len(candidates) - (candidate is not None) and \
+           count_bits(covered) >= still_needed:
+            chosen = choose_placements(remaining, free & ~placement[0],
+                                       attempts_left, failed)
+            if chosen is not None:
+                if candidate is not None:
+                    chosen[candidate[0]] = placement
+                return chosen
+
+    if attempts_left[0] > 0:
+        failed.add(state)
+    return None
+
+
+def get_cell_options(candidates: List[list], free: int,
+                     can_leave_empty: bool) -> List[list]:
+    """
+    Return the [candidate, placement] pairs from candidates, a list of [ship
+    index, ship size, placements], whose placement covers the cell in free
+    that is covered by the fewest placements, using one ship of each size.
+    If can_leave_empty is True, also include [None, mask of the cell] for
+    leaving the cell EMPTY.
+    """
+
+    # Ships of the same size have the same placements, so only the first
+    # ship of each size is used
+    firsts = []
+    for candidate in candidates:
+        if all(first[1] != candidate[1] for first in firsts):
+            firsts.append(candidate)
+
+    cover_counts = {}
+    for candidate in firsts:
+        for placement in candidate[2]:
+            mask = placement[0]
+            while mask:
+                low = mask & -mask
+                cover_counts[low] = cover_counts.get(low, 0) + 1
+                mask = mask ^ low
+
+    cell = 0
+    fewest = -1
+    mask = free
+    while mask:
+        low = mask & -mask
+        if fewest == -1 or cover_counts.get(low, 0) < fewest:
+            cell = low
+            fewest = cover_counts.get(low, 0)
+        mask = mask ^ low
+
+    options = []
+    for candidate in firsts:
+        for placement in candidate[2]:
+            if placement[0] & cell:
+                options.append([candidate, placement])
+    if can_leave_empty:
+        options.append([None, [cell]])
+    return options
+
+
 def make_empty_grid(grid_size: int) -> List[List[str]]:
     """
     Return a grid_size by grid_size grid containing EMPTY in every cell.
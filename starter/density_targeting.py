@@ -0,0 +1,383 @@
+"""A hunt/target computer player based on ship placement counts.
+
+For every cell, the targeter counts the ship placements (a ship size, a
+start cell and a direction) that cover the cell and contain no MISS cell.
+Placements that also contain HIT cells are counted separately, so that once
+a ship has been hit the targeter shoots next to it (target mode), and
+otherwise at the cell covered by the most placements (hunt mode).
+
+The counts are updated after each shot using only the placements through
+the cell that was shot, instead of being recomputed for the whole grid.
+
+No other ship can cover the cells of a sunk ship, so once a ship is recorded
+as sunk its cells rule placements out like MISS cells do, and its HIT cells
+no longer draw target mode. The target grid does not say which ships are
+sunk, so a DensityStrategy records only the ships the grid proves are sunk.
+
+make_density_strategy is a strategy factory for simulate.py and
+tournament.py: it is given the ship sizes of each game.
+"""
+
+from typing import List
+
+import battleship_functions as bf
+from bitboard import placement_table
+
+
+class DensityTargeter:
+    """Placement counts for one target grid.
+
+    === Attributes ===
+    grid_size: the number of rows (and columns) of the target grid
+    placements: the cell indexes (row * grid_size + col) of each placement
+    weights: weights[p] is the number of ships that fit placements[p]
+    cell_placements: cell_placements[c] has the placements covering cell c
+    misses: misses[p] is the number of MISS cells in placements[p]
+    hits: hits[p] is the number of HIT cells in placements[p]
+    density: density[c] is the weight of the placements covering cell c
+        with no MISS cells
+    hit_density: hit_density[c] is the total number of HIT cells in the
+        placements counted by density[c], each times its weight
+    shot: shot[c] is True iff cell c is not UNKNOWN
+    sunk: sunk[c] is True iff cell c is part of a ship recorded as sunk
+    remaining_sizes: the sizes of the ships not recorded as sunk
+    """
+
+    def __init__(self, grid_size: int, sizes: List[int]) -> None:
+        self.grid_size = grid_size
+        self.placements = []
+        self.weights = []
+        self.cell_placements = [[] for _ in range(grid_size * grid_size)]
+        self.density = [0] * (grid_size * grid_size)
+        self.hit_density = [0] * (grid_size * grid_size)
+        self.shot = [False] * (grid_size * grid_size)
+        self.sunk = [False] * (grid_size * grid_size)
+        self.remaining_sizes = list(sizes)
+
+        ships_of_size = {}
+        for size in sizes:
+            if size <= grid_size:
+                ships_of_size[size] = ships_of_size.get(size, 0) + 1
+
+        for size in sorted(ships_of_size):
+            for placement in placement_table(grid_size, size):
+                mask = placement[0]
+                cells = []
+                while mask:
+                    low = mask & -mask
+                    cells.append(low.bit_length() - 1)
+                    mask ^= low
+                self._add_placement(cells, ships_of_size[size])
+
+        self.misses = [0] * len(self.placements)
+        self.hits = [0] * len(self.placements)
+
+    def _add_placement(self, cells: List[int], weight: int) -> None:
+        """
+        Add the placement of weight ships on cells, with no shots in it.
+        """
+
+        index = len(self.placements)
+        self.placements.append(cells)
+        self.weights.append(weight)
+        for cell in cells:
+            self.cell_placements[cell].append(index)
+            self.density[cell] += weight
+
+    def record_shot(self, row: int, col: int, result: str) -> None:
+        """
+        Update the counts for a shot at row and col, where result is HIT or
+        MISS.
+
+        >>> targeter = DensityTargeter(3, [2])
+        >>> targeter.density[1]
+        3
+        >>> targeter.record_shot(0, 0, bf.MISS)
+        >>> targeter.density[1]
+        2
+        >>> targeter.record_shot(1, 1, bf.HIT)
+        >>> targeter.hit_density[1]
+        1
+        """
+
+        cell = row * self.grid_size + col
+        if self.shot[cell]:
+            return
+        self.shot[cell] = True
+
+        if result == bf.MISS:
+            self._rule_out(cell)
+            return
+
+        for index in self.cell_placements[cell]:
+            if self.misses[index] == 0:
+                for other in self.placements[index]:
+                    self.hit_density[other] += self.weights[index]
+            self.hits[index] += 1
+
+    def _rule_out(self, cell: int) -> None:
+        """
+        Update the counts for cell, which no ship afloat can cover.
+        """
+
+        for index in self.cell_placements[cell]:
+            if self.misses[index] == 0:
+                # The placement is no longer possible
+                weight = self.weights[index]
+                change = self.hits[index] * weight
+                for other in self.placements[index]:
+                    self.density[other] -= weight
+                    self.hit_density[other] -= change
+            self.misses[index] += 1
+
+    def record_sunk(self, cells: List[List[int]]) -> None:
+        """
+        Update the counts for a sunk ship that covers cells, each [row, col].
+        The cells must have been recorded as HIT. They are ruled out for the
+        other ships, and one fewer ship of their size is counted.
+
+        >>> targeter = DensityTargeter(3, [2, 3])
+        >>> targeter.record_shot(0, 0, bf.HIT)
+        >>> targeter.record_shot(0, 1, bf.HIT)
+        >>> targeter.choose_move()
+        [0, 2]
+        >>> targeter.record_sunk([[0, 0], [0, 1]])
+        >>> max(targeter.hit_density), targeter.remaining_sizes
+        (0, [3])
+        >>> targeter.choose_move()
+        [1, 2]
+        """
+
+        size = len(cells)
+        if size in self.remaining_sizes:
+            self.remaining_sizes.remove(size)
+            for index in range(len(self.placements)):
+                if len(self.placements[index]) == size and \
+                   self.weights[index] > 0:
+                    if self.misses[index] == 0:
+                        for other in self.placements[index]:
+                            self.density[other] -= 1
+                            self.hit_density[other] -= self.hits[index]
+                    self.weights[index] -= 1
+
+        for row, col in cells:
+            cell = row * self.grid_size + col
+            if not self.sunk[cell]:
+                self.sunk[cell] = True
+                self._rule_out(cell)
+
+    def record_proven_sinks(self, target_grid: List[List[str]],
+                            row: int = None, col: int = None) -> None:
+        """
+        Record as sunk each line of HIT cells in target_grid that must be a
+        whole ship: a row or column of HIT cells, not yet recorded as sunk,
+        with no UNKNOWN or other HIT cell next to it, whose length is the
+        size of a ship afloat but not the total size of two or more of them.
+        If row and col are given, only the lines a shot there can complete
+        are checked: the lines through it if it is a HIT, or else the lines
+        through the cells next to it.
+
+        >>> targeter = DensityTargeter(3, [2, 3])
+        >>> target_grid = [['X', 'X', 'M'], ['M', 'M', '-'], ['-', '-', '-']]
+        >>> targeter.record_target_grid(target_grid)
+        >>> targeter.record_proven_sinks(target_grid, 1, 1)
+        >>> targeter.remaining_sizes, targeter.sunk[:3]
+        ([3], [True, True, False])
+        """
+
+        n = self.grid_size
+        if row is None:
+            starts = [[cell // n, cell % n] for cell in range(n * n)]
+        elif target_grid[row][col] == bf.HIT:
+            starts = [[row, col]]
+        else:
+            starts = [[row - 1, col], [row + 1, col], [row, col - 1],
+                      [row, col + 1]]
+
+        while starts:
+            start_row, start_col = starts.pop()
+            if not self._is_afloat_hit(start_row, start_col, target_grid):
+                continue
+            for vertical in (False, True):
+                run = self._hit_run(start_row, start_col, vertical,
+                                    target_grid)
+                if run and len(run) in self.remaining_sizes and \
+                   self._is_sealed(run, vertical, target_grid) and \
+                   len(run) not in self._split_sizes():
+                    self.record_sunk(run)
+                    # The new wreck may seal the lines next to it, and with
+                    # one ship fewer afloat, lines anywhere may now be proven
+                    starts = [[cell // n, cell % n] for cell in range(n * n)
+                              if self._is_afloat_hit(cell // n, cell % n,
+                                                     target_grid)]
+                    break
+
+    def _hit_run(self, row: int, col: int, vertical: bool,
+                 target_grid: List[List[str]]) -> List[List[int]]:
+        """
+        Return the cells of the row (or column if vertical is True) of HIT
+        cells not recorded as sunk that contains row and col, or [] if that
+        cell is not one of them.
+        """
+
+        if not self._is_afloat_hit(row, col, target_grid):
+            return []
+
+        dr, dc = (1, 0) if vertical else (0, 1)
+        while self._is_afloat_hit(row - dr, col - dc, target_grid):
+            row, col = row - dr, col - dc
+        run = []
+        while self._is_afloat_hit(row, col, target_grid):
+            run.append([row, col])
+            row, col = row + dr, col + dc
+        return run
+
+    def _is_afloat_hit(self, row: int, col: int,
+                       target_grid: List[List[str]]) -> bool:
+        """
+        Return True iff row and col is a HIT cell not recorded as sunk.
+        """
+
+        return 0 <= row < self.grid_size and 0 <= col < self.grid_size and \
+            target_grid[row][col] == bf.HIT and \
+            not self.sunk[row * self.grid_size + col]
+
+    def _split_sizes(self) -> List[int]:
+        """
+        Return the total sizes of every two or more ships afloat.
+
+        >>> DensityTargeter(6, [2, 3, 3])._split_sizes()
+        [5, 6, 8]
+        """
+
+        one = set()
+        more = set()
+        for size in self.remaining_sizes:
+            more |= {total + size for total in one | more}
+            one.add(size)
+        return sorted(more)
+
+    def _is_sealed(self, run: List[List[int]], vertical: bool,
+                   target_grid: List[List[str]]) -> bool:
+        """
+        Return True iff every cell next to run (the cells of a row, or of a
+        column if vertical is True) is off the grid, a MISS or sunk.
+        """
+
+        dr, dc = (1, 0) if vertical else (0, 1)
+        neighbours = [[run[0][0] - dr, run[0][1] - dc],
+                      [run[-1][0] + dr, run[-1][1] + dc]]
+        for row, col in run:
+            neighbours.append([row - dc, col - dr])
+            neighbours.append([row + dc, col + dr])
+
+        for row, col in neighbours:
+            if bf.is_valid_cell(row, col, self.grid_size) and \
+               target_grid[row][col] != bf.MISS and \
+               not self.sunk[row * self.grid_size + col]:
+                return False
+        return True
+
+    def record_target_grid(self, target_grid: List[List[str]]) -> None:
+        """
+        Update the counts for every HIT or MISS cell in target_grid that has
+        not been recorded yet.
+        """
+
+        for row in range(self.grid_size):
+            for col in range(self.grid_size):
+                if target_grid[row][col] != bf.UNKNOWN:
+                    self.record_shot(row, col, target_grid[row][col])
+
+    def choose_move(self) -> List[int]:
+        """
+        Return the row and column of the UNKNOWN cell to shoot next: the one
+        next to the most hits (target mode), or else the one covered by the
+        most possible placements (hunt mode). The grid must have an UNKNOWN
+        cell.
+
+        >>> targeter = DensityTargeter(3, [2])
+        >>> targeter.choose_move()
+        [1, 1]
+        >>> targeter.record_shot(1, 1, bf.HIT)
+        >>> targeter.choose_move()
+        [0, 1]
+        """
+
+        best_cell = -1
+        best_score = (-1, -1)
+        for cell in range(len(self.shot)):
+            if not self.shot[cell]:
+                score = (self.hit_density[cell], self.density[cell])
+                if score > best_score:
+                    best_cell = cell
+                    best_score = score
+
+        return [best_cell // self.grid_size, best_cell % self.grid_size]
+
+
+class DensityStrategy:
+    """The moves of a DensityTargeter in one game, for a fleet with known
+    ship sizes.
+
+    The targeter is made from the target grid on the first call, and after
+    that only the cell returned by the previous call is read from the grid,
+    so each call takes time proportional to the placements through that
+    cell plus one pass over the cells to choose the move.
+
+    === Attributes ===
+    sizes: the ship sizes of the fleet being shot at
+    targeter: the DensityTargeter of the game, or None before the first move
+    last_move: the move returned by the previous call, or None
+    """
+
+    def __init__(self, sizes: List[int]) -> None:
+        self.sizes = sizes
+        self.targeter = None
+        self.last_move = None
+
+    def __call__(self, target_grid: List[List[str]]) -> List[int]:
+        """
+        Return the row and column of the next move on target_grid, the
+        target grid of this strategy's game.
+
+        >>> strategy = DensityStrategy([2])
+        >>> target_grid = [['-', '-', '-'], ['-', '-', '-'], ['-', '-', '-']]
+        >>> strategy(target_grid)
+        [1, 1]
+        >>> target_grid[1][1] = bf.HIT
+        >>> strategy(target_grid)
+        [0, 1]
+        """
+
+        if self.targeter is None:
+            self.targeter = DensityTargeter(len(target_grid), self.sizes)
+            self.targeter.record_target_grid(target_grid)
+            self.targeter.record_proven_sinks(target_grid)
+        elif self.last_move is not None:
+            row, col = self.last_move
+            if target_grid[row][col] != bf.UNKNOWN:
+                self.targeter.record_shot(row, col, target_grid[row][col])
+                self.targeter.record_proven_sinks(target_grid, row, col)
+
+        self.last_move = self.targeter.choose_move()
+        return self.last_move
+
+
+def make_density_strategy(sizes: List[int]) -> DensityStrategy:
+    """
+    Return a new strategy for one game against a fleet with ship sizes.
+
+    >>> make_density_strategy([5, 4])([['-', '-'], ['-', '-']])
+    [0, 0]
+    """
+
+    return DensityStrategy(sizes)
+
+
+make_density_strategy.strategy_factory = True
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,283 @@
+"""Property-based fuzzing of validate_fleet_grid with the bundled hypothesis.
+
+The strategies here build valid fleet grids and almost-valid ones (a bent
+ship, a ship with a gap, a wrong cell count, two overlapping ships or a
+stray character), and validate_fleet_grid is checked against
+reference_validate, a direct implementation of the rules. Failing examples
+are saved in an example database, so the next run replays them first;
+--replay runs only the saved examples.
+
+    python fuzz_validators.py --examples 2000
+    python fuzz_validators.py --replay
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, 'new_pyta'))
+
+import hypothesis
+from hypothesis import HealthCheck, Phase, given, settings
+from hypothesis import strategies as st
+from hypothesis.database import DirectoryBasedExampleDatabase
+
+import battleship_functions as bf
+from bitboard import placement_table
+
+DEFAULT_DATABASE = os.path.join(HERE, '.hypothesis', 'validators')
+
+SHIP_CHARACTERS = 'abcdefghij'
+
+# The ways an almost-valid grid is broken
+MUTATIONS = ['bend', 'gap', 'extra_cell', 'missing_cell', 'overlap',
+             'stray_character']
+
+
+def reference_validate(fleet_grid: List[List[str]], ships: List[str],
+                       sizes: List[int]) -> bool:
+    """
+    Return True iff fleet_grid is valid for ships and sizes: every ship has
+    exactly its size of cells, all in one row or column and next to each
+    other, and every other cell is EMPTY.
+
+    >>> reference_validate([['a', 'a'], ['.', 'b']], ['a', 'b'], [2, 1])
+    True
+    >>> reference_validate([['a', '.'], ['.', 'a']], ['a'], [2])
+    False
+    """
+
+    cells = {}
+    for row in range(len(fleet_grid)):
+        for col in range(len(fleet_grid[row])):
+            if fleet_grid[row][col] != bf.EMPTY:
+                cells.setdefault(fleet_grid[row][col], []).append([row, col])
+
+    if sorted(cells) != sorted(ships):
+        return False
+    for i in range(len(ships)):
+        ship_cells = cells[ships[i]]
+        if len(ship_cells) != sizes[i]:
+            return False
+        rows = sorted(set(cell[0] for cell in ship_cells))
+        cols = sorted(set(cell[1] for cell in ship_cells))
+        if len(rows) == 1:
+            line = cols
+        elif len(cols) == 1:
+            line = rows
+        else:
+            return False
+        if line != list(range(line[0], line[0] + sizes[i])):
+            return False
+    return True
+
+
+@st.composite
+def valid_games(draw: Callable, max_grid_size: int = 10) -> List:
+    """
+    Return a strategy for [fleet_grid, ships, sizes] of a valid game with a
+    grid of at most max_grid_size.
+    """
+
+    grid_size = draw(st.integers(1, max_grid_size))
+    num_ships = draw(st.integers(1, min(len(SHIP_CHARACTERS), grid_size)))
+    fleet_grid = [[bf.EMPTY] * grid_size for _ in range(grid_size)]
+    ships = []
+    sizes = []
+    occupied = 0
+    for i in range(num_ships):
+        size = draw(st.integers(bf.MIN_SHIP_SIZE,
+                                min(bf.MAX_SHIP_SIZE, grid_size)))
+        free = [placement for placement in placement_table(grid_size, size)
+                if not placement[0] & occupied]
+        if not free:
+            break
+        mask, row1, col1, row2, col2 = draw(st.sampled_from(free))
+        occupied |= mask
+        for row in range(row1, row2 + 1):
+            for col in range(col1, col2 + 1):
+                fleet_grid[row][col] = SHIP_CHARACTERS[i]
+        ships.append(SHIP_CHARACTERS[i])
+        sizes.append(size)
+    return [fleet_grid, ships, sizes]
+
+
+def _ship_cells(fleet_grid: List[List[str]], ship: str) -> List[List[int]]:
+    """
+    Return the [row, col] of every cell of ship in fleet_grid, in row order.
+    """
+
+    return [[row, col] for row in range(len(fleet_grid))
+            for col in range(len(fleet_grid)) if fleet_grid[row][col] == ship]
+
+
+def _empty_cells(fleet_grid: List[List[str]]) -> List[List[int]]:
+    """
+    Return the [row, col] of every EMPTY cell of fleet_grid.
+    """
+
+    return _ship_cells(fleet_grid, bf.EMPTY)
+
+
+@st.composite
+def almost_valid_games(draw: Callable, max_grid_size: int = 10) -> List:
+    """
+    Return a strategy for [fleet_grid, ships, sizes, mutation]: a valid game
+    broken by one of MUTATIONS. If the drawn mutation does not fit the game
+    (say, a bend in a grid with no room for one), the game is broken with
+    an extra cell instead, or returned valid with mutation None when the
+    grid is full.
+    """
+
+    fleet_grid, ships, sizes = draw(valid_games(max_grid_size))
+    mutation = draw(st.sampled_from(MUTATIONS))
+    index = draw(st.integers(0, len(ships) - 1))
+    ship = ships[index]
+    cells = _ship_cells(fleet_grid, ship)
+    empty = _empty_cells(fleet_grid)
+
+    # A bend needs three cells: a two-cell ship with a moved end is straight
+    if mutation in ('bend', 'gap') and \
+            len(cells) >= (3 if mutation == 'bend' else 2):
+        # Move an end cell of the ship off its line (bend) or one cell
+        # further along it (gap)
+        end = cells[-1]
+        vertical = cells[0][1] == end[1]
+        if mutation == 'bend':
+            options = [[end[0] + 1, end[1] - 1], [end[0] - 1, end[1] - 1]]
+            if vertical:
+                options = [[end[0] - 1, end[1] + 1], [end[0] - 1, end[1] - 1]]
+        elif vertical:
+            options = [[end[0] + 1, end[1]]]
+        else:
+            options = [[end[0], end[1] + 1]]
+        options = [cell for cell in options if cell in empty]
+        if options:
+            row, col = draw(st.sampled_from(options))
+            fleet_grid[end[0]][end[1]] = bf.EMPTY
+            fleet_grid[row][col] = ship
+            return [fleet_grid, ships, sizes, mutation]
+    elif mutation == 'missing_cell':
+        row, col = draw(st.sampled_from(cells))
+        fleet_grid[row][col] = bf.EMPTY
+        return [fleet_grid, ships, sizes, mutation]
+    elif mutation == 'overlap' and len(ships) >= 2:
+        other = draw(st.sampled_from([cell for name in ships if name != ship
+                                      for cell in _ship_cells(fleet_grid,
+                                                              name)]))
+        fleet_grid[other[0]][other[1]] = ship
+        return [fleet_grid, ships, sizes, mutation]
+    elif mutation == 'stray_character' and empty:
+        row, col = draw(st.sampled_from(empty))
+        fleet_grid[row][col] = draw(st.sampled_from('z?' + bf.HIT))
+        return [fleet_grid, ships, sizes, mutation]
+
+    if not empty:
+        return [fleet_grid, ships, sizes, None]
+    row, col = draw(st.sampled_from(empty))
+    fleet_grid[row][col] = ship
+    return [fleet_grid, ships, sizes, 'extra_cell']
+
+
+def _copy_grid(fleet_grid: List[List[str]]) -> List[List[str]]:
+    """
+    Return a copy of fleet_grid.
+    """
+
+    return [row[:] for row in fleet_grid]
+
+
+def make_properties(examples: int, database: str, replay: bool,
+                    seed: int = None) -> Dict[str, Callable]:
+    """
+    Return the properties to run, by name, each checking up to examples
+    examples (or only the saved ones if replay is True) with the example
+    database in the directory database, and seeded with seed if it is not
+    None. Each property returns the number of examples it ran.
+    """
+
+    phases = [Phase.explicit, Phase.reuse]
+    if not replay:
+        phases.extend([Phase.generate, Phase.shrink])
+    config = settings(max_examples=examples, deadline=None, phases=phases,
+                      database=DirectoryBasedExampleDatabase(database),
+                      suppress_health_check=[HealthCheck.too_slow,
+                                             HealthCheck.filter_too_much])
+
+    def run(strategy: st.SearchStrategy, must_be_invalid: bool) -> Callable:
+        count = [0]
+
+        @config
+        @given(game=strategy)
+        def property_check(game: List) -> None:
+            count[0] += 1
+            fleet_grid, ships, sizes = game[:3]
+            expected = reference_validate(fleet_grid, ships, sizes)
+            actual = bf.validate_fleet_grid(_copy_grid(fleet_grid), ships,
+                                            sizes)
+            assert actual == expected, \
+                'validate_fleet_grid returned {0} but should return ' \
+                '{1}'.format(actual, expected)
+            if must_be_invalid:
+                assert game[3] is None or not expected, \
+                    'the {0} mutation left the grid valid'.format(game[3])
+
+        if seed is not None:
+            property_check = hypothesis.seed(seed)(property_check)
+
+        def counted() -> int:
+            count[0] = 0
+            property_check()
+            return count[0]
+
+        return counted
+
+    return {'valid_games': run(valid_games(), False),
+            'almost_valid_games': run(almost_valid_games(), True)}
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Run the properties with the command line arguments argv, print the
+    examples per second of each, and return the exit status: 1 if a
+    property failed and 0 otherwise.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--examples', type=int, default=1000,
+                        help='examples per property')
+    parser.add_argument('--database', default=DEFAULT_DATABASE,
+                        help='directory of the example database')
+    parser.add_argument('--replay', action='store_true',
+                        help='only run the saved examples')
+    parser.add_argument('--seed', type=int,
+                        help='generate the same examples on every run')
+    args = parser.parse_args(argv)
+
+    status = 0
+    properties = make_properties(args.examples, args.database, args.replay,
+                                 args.seed)
+    for name in properties:
+        start = time.perf_counter()
+        try:
+            count = properties[name]()
+            outcome = 'passed'
+        except AssertionError as error:
+            count = None
+            outcome = 'FAILED: {0}'.format(error)
+            status = 1
+        seconds = time.perf_counter() - start
+        if count is None:
+            print('{0}: {1} ({2:.3f} s)'.format(name, outcome, seconds))
+        else:
+            print('{0}: {1} examples {2} in {3:.3f} s, {4:.0f} examples/s'
+                  .format(name, count, outcome, seconds,
+                          count / seconds if seconds > 0 else 0))
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""Packed corpora of fleet grids, read through mmap without copying.
+
+A corpus file holds many fleet grids that share a grid size, ships and
+sizes:
+
+    magic      4 bytes, b'BSCP'
+    version    uint8
+    grid_size  uint16
+    ships      uint16 count, then one byte per ship character
+    sizes      uint16 each
+    games      grid_size * grid_size bytes per game: the characters of the
+               fleet grid, row by row, as in a game file
+
+All numbers are little-endian. Ship characters must be single bytes
+(ASCII). The number of games follows from the file size, so games can be
+appended to a corpus.
+
+A CorpusReader maps the file into memory, and each game is available as a
+memoryview (or a NumPy array view) of its bytes, so games can be validated
+or simulated without building a str for every cell.
+
+    python game_corpus.py pack games.bscp game1.txt game3.txt
+    python game_corpus.py validate games.bscp
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+from typing import BinaryIO, Iterator, List
+
+import battleship_functions as bf
+import play_battleship as pb
+
+MAGIC = b'BSCP'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBHH')
+
+
+def write_header(corpus_file: BinaryIO, grid_size: int, ships: List[str],
+                 sizes: List[int]) -> None:
+    """
+    Write the corpus header for games with grid_size, ships and sizes to
+    corpus_file.
+    """
+
+    for ship in ships:
+        if len(ship.encode('ascii')) != 1:
+            raise ValueError('ship {0!r} is not one byte'.format(ship))
+    corpus_file.write(_HEADER.pack(MAGIC, VERSION, grid_size, len(ships)))
+    corpus_file.write(''.join(ships).encode('ascii'))
+    corpus_file.write(struct.pack('<{0}H'.format(len(sizes)), *sizes))
+
+
+def write_game(corpus_file: BinaryIO, fleet_grid: List[List[str]]) -> None:
+    """
+    Write the cells of fleet_grid to corpus_file, after its header.
+    """
+
+    corpus_file.write(''.join([''.join(row) for row in fleet_grid]).encode(
+        'ascii'))
+
+
+def pack_game_files(filenames: Iterator[str], corpus_file: BinaryIO) -> int:
+    """
+    Write a corpus of the fleet grids in the game files filenames to
+    corpus_file, and return the number of games written. Every game must
+    have the grid size, ships and sizes of the first one; raise ValueError
+    if one does not.
+    """
+
+    header = None
+    count = 0
+    for filename in filenames:
+        with open(filename) as game_file:
+            ships, sizes = bf.read_ship_data(game_file)
+            fleet_grid = pb.read_fleet_grid(game_file)
+        if any(len(row) != len(fleet_grid) for row in fleet_grid):
+            raise ValueError('{0} does not have a square grid'.format(
+                filename))
+        game_header = [len(fleet_grid), ships, sizes]
+        if header is None:
+            header = game_header
+            write_header(corpus_file, len(fleet_grid), ships, sizes)
+        elif game_header != header:
+            raise ValueError('{0} does not match the corpus header'.format(
+                filename))
+        write_game(corpus_file, fleet_grid)
+        count = count + 1
+    return count
+
+
+def validate_game_bytes(cells: bytes, grid_size: int, ships: List[str],
+                        sizes: List[int]) -> bool:
+    """
+    Return True iff the grid_size by grid_size fleet grid whose characters
+    are cells is valid for ships and sizes, by the rules of
+    battleship_functions.validate_fleet_grid. Every ship is checked with
+    bytes searches, without splitting the grid into cells.
+
+    >>> validate_game_bytes(b'.b..b.aaa', 3, ['a', 'b'], [3, 2])
+    True
+    >>> validate_game_bytes(b'..b.b.aaa', 3, ['a', 'b'], [3, 2])
+    False
+    """
+
+    if cells.count(bf.EMPTY.encode('ascii')) + sum(sizes) != len(cells):
+        return False
+
+    for i in range(len(ships)):
+        ship = ships[i].encode('ascii')
+        size = sizes[i]
+        if cells.count(ship) != size:
+            return False
+        first = cells.find(ship)
+        last = cells.rfind(ship)
+        if first // grid_size == last // grid_size:
+            # Horizontal: every cell from first to last is the ship
+            if last - first != size - 1:
+                return False
+        elif last - first != (size - 1) * grid_size or \
+                cells[first:last + 1:grid_size] != ship * size:
+            return False
+
+    return True
+
+
+class CorpusReader:
+    """A corpus file mapped into memory.
+
+    === Attributes ===
+    grid_size: the number of rows (and columns) of every fleet grid
+    ships: the ship characters of every game
+    sizes: the ship sizes of every game
+    """
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, 'rb')
+        if os.fstat(self._file.fileno()).st_size < _HEADER.size:
+            self._file.close()
+            raise ValueError('{0} is too short to be a corpus: it has no '
+                             'header'.format(path))
+        self._mmap = mmap.mmap(self._file.fileno(), 0,
+                               access=mmap.ACCESS_READ)
+        magic, version, grid_size, num_ships = _HEADER.unpack_from(
+            self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError('{0} is not a version {1} corpus'.format(
+                path, VERSION))
+        if grid_size == 0:
+            self.close()
+            raise ValueError('{0} has a grid size of 0, so it cannot hold '
+                             'any games'.format(path))
+
+        offset = _HEADER.size
+        if len(self._mmap) < offset + 3 * num_ships:
+            self.close()
+            raise ValueError('{0} is too short to be a corpus: its header '
+                             'is cut off'.format(path))
+        self.grid_size = grid_size
+        self.ships = list(self._mmap[offset:offset + num_ships].decode(
+            'ascii'))
+        offset += num_ships
+        self.sizes = list(struct.unpack_from('<{0}H'.format(num_ships),
+                                             self._mmap, offset))
+        self._start = offset + 2 * num_ships
+        self._game_bytes = grid_size * grid_size
+
+    def __len__(self) -> int:
+        return (len(self._mmap) - self._start) // self._game_bytes
+
+    def close(self) -> None:
+        """
+        Unmap and close the corpus file. Views from game_view or numpy_view
+        stay usable: if any is still alive, the file is unmapped once the
+        last one is released.
+
+        >>> import tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'games.bscp')
+        >>> with open(path, 'wb') as corpus_file:
+        ...     write_header(corpus_file, 2, ['a'], [2])
+        ...     write_game(corpus_file, [['a', 'a'], ['.', '.']])
+        >>> with CorpusReader(path) as reader:
+        ...     view = reader.game_view(0)
+        >>> view.tobytes()
+        b'aa..'
+        """
+
+        try:
+            self._mmap.close()
+        except BufferError:
+            # A view still exports the map; dropping our reference leaves
+            # it to be unmapped when the last view is released.
+            pass
+        self._mmap = None
+        self._file.close()
+
+    def __enter__(self) -> 'CorpusReader':
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _offset(self, game: int) -> int:
+        """
+        Return the file offset of game, or raise IndexError.
+        """
+
+        if not 0 <= game < len(self):
+            raise IndexError('game {0} is not in the corpus'.format(game))
+        return self._start + game * self._game_bytes
+
+    def game_view(self, game: int) -> memoryview:
+        """
+        Return a memoryview of the cells of game, row by row, without
+        copying them.
+        """
+
+        offset = self._offset(game)
+        return memoryview(self._mmap)[offset:offset + self._game_bytes]
+
+    def numpy_view(self) -> 'numpy.ndarray':
+        """
+        Return a read-only uint8 NumPy array of shape (games, grid_size,
+        grid_size) viewing every game's cells without copying them. This
+        needs NumPy.
+        """
+
+        import numpy
+        return numpy.frombuffer(self._mmap, dtype=numpy.uint8,
+                                count=len(self) * self._game_bytes,
+                                offset=self._start).reshape(
+                                    len(self), self.grid_size,
+                                    self.grid_size)
+
+    def is_valid_game(self, game: int) -> bool:
+        """
+        Return True iff the fleet grid of game is valid.
+        """
+
+        offset = self._offset(game)
+        return validate_game_bytes(self._mmap[offset:offset +
+                                              self._game_bytes],
+                                   self.grid_size, self.ships, self.sizes)
+
+    def fleet_grid(self, game: int) -> List[List[str]]:
+        """
+        Return the fleet grid of game as a list of list of str, for code
+        that needs one (such as GameState).
+        """
+
+        cells = self.game_view(game).tobytes().decode('ascii')
+        size = self.grid_size
+        return [list(cells[row * size:(row + 1) * size])
+                for row in range(size)]
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Run the corpus tool with the command line arguments argv, and return the
+    exit status.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command')
+    pack = commands.add_parser('pack', help='pack game files into a corpus')
+    pack.add_argument('corpus')
+    pack.add_argument('game_files', nargs='+')
+    validate = commands.add_parser('validate',
+                                   help='list the invalid games of a corpus')
+    validate.add_argument('corpus')
+    args = parser.parse_args(argv)
+
+    if args.command == 'pack':
+        with open(args.corpus, 'wb') as corpus_file:
+            try:
+                count = pack_game_files(args.game_files, corpus_file)
+            except ValueError as error:
+                print(error, file=sys.stderr)
+                return 1
+        print('packed {0} games'.format(count))
+        return 0
+    if args.command == 'validate':
+        invalid = 0
+        try:
+            reader = CorpusReader(args.corpus)
+        except ValueError as error:
+            print(error, file=sys.stderr)
+            return 1
+        with reader:
+            for game in range(len(reader)):
+                if not reader.is_valid_game(game):
+                    print('game {0} is not valid'.format(game))
+                    invalid = invalid + 1
+            print('{0} of {1} games are valid'.format(len(reader) - invalid,
+                                                      len(reader)))
+        return 0 if invalid == 0 else 1
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""An asyncio server for many human versus computer games at once.
+
+Each connection plays its own game of play_battleship.play_versus_computer,
+over a line-based protocol. Client commands:
+
+    GAME            followed by the lines of a game file, then END: start a
+                    game with that fleet against a generated computer fleet
+    MOVE row col    shoot at row and col; the computer then shoots back
+    GRIDS           show the player's target grid and fleet grid
+    QUIT            close the connection
+
+Every reply line starts with a word saying what it is: OK, ERROR, YOU,
+COMPUTER, SUNK, GRID, WIN or LOSE. A reply ends with a line containing
+just a full stop. For example:
+
+    MOVE 3 1
+    YOU hit a ship
+    COMPUTER 7 2 missed
+    .
+
+Start a server on localhost with:
+
+    python game_server.py --port 8765
+
+The computer plays computer_functions.make_computer_move by default, or any
+strategy or strategy factory of simulate.py given with --strategy; a factory
+is given the ship sizes of each game.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+from typing import Callable, List
+
+import battleship_functions as bf
+import computer_functions as cf
+import play_battleship as pb
+import simulate
+from game_state import GameState
+
+# The longest line a client may send
+MAX_LINE_LENGTH = 4096
+
+# The number of lines of a game file before its fleet grid
+GAME_HEADER_LINES = 2
+
+
+def parse_player_move(row: str, col: str,
+                      target_grid: List[List[str]]) -> List[int]:
+    """
+    Return the move [row, col] given as text, or None if it is not a valid
+    move on target_grid by the rules of play_battleship.get_valid_player_move:
+    both must be digits, and the cell must be an UNKNOWN cell of the grid.
+
+    >>> parse_player_move('1', '0', [['-', '-'], ['M', '-']]) is None
+    True
+    >>> parse_player_move('0', '1', [['-', '-'], ['M', '-']])
+    [0, 1]
+    >>> parse_player_move('0', 'x', [['-', '-'], ['M', '-']]) is None
+    True
+    """
+
+    if not (row.isdigit() and col.isdigit()):
+        return None
+    row = int(row)
+    col = int(col)
+    if not bf.is_valid_cell(row, col, len(target_grid)) or \
+       bf.is_not_given_char(row, col, target_grid, bf.UNKNOWN):
+        return None
+    return [row, col]
+
+
+def max_game_lines(game_lines: List[str]) -> int:
+    """
+    Return the most lines a valid game file that starts with game_lines can
+    have: the header lines and one line per row of the fleet grid, whose
+    size is the length of its first row, and at most MAX_GRID_SIZE.
+
+    >>> max_game_lines(['a', '1'])
+    12
+    >>> max_game_lines(['a', '1', '..'])
+    4
+    """
+
+    grid_size = bf.MAX_GRID_SIZE
+    if len(game_lines) > GAME_HEADER_LINES:
+        grid_size = min(len(game_lines[GAME_HEADER_LINES]), grid_size)
+    return GAME_HEADER_LINES + grid_size
+
+
+def _captured_lines(output: io.StringIO, tag: str) -> List[str]:
+    """
+    Return each line printed to output, prefixed with tag.
+    """
+
+    return ['{0} {1}'.format(tag, line)
+            for line in output.getvalue().splitlines() if line]
+
+
+class Session:
+    """The game played on one connection.
+
+    === Attributes ===
+    player: the player's shots at the computer's fleet, or None before a
+        game is started
+    computer: the computer's shots at the player's fleet
+    strategy: the strategy or strategy factory the computer plays
+    computer_move: the computer's strategy in the current game, or None
+        before a game is started
+    """
+
+    def __init__(self, strategy: Callable = cf.make_computer_move) -> None:
+        self.player = None
+        self.computer = None
+        self.strategy = strategy
+        self.computer_move = None
+
+    def start_game(self, game_lines: List[str]) -> List[str]:
+        """
+        Start a game with the game file in game_lines, and return the reply.
+
+        >>> session = Session()
+        >>> session.start_game(['a', '1', '..', '.a'])
+        ['OK game started on a 2 by 2 grid']
+        >>> session.start_game(['a', '2', '..', '.a'])
+        ['ERROR The supplied game is not valid.']
+        """
+
+        try:
+            ships, sizes = bf.read_ship_data(io.StringIO(
+                '\n'.join(game_lines[:2]) + '\n'))
+        except ValueError:
+            return ['ERROR The supplied game is not valid.']
+        fleet_grid = pb.read_fleet_grid(game_lines[2:])
+        if not pb.is_valid_game(fleet_grid, ships, sizes):
+            return ['ERROR The supplied game is not valid.']
+
+        grid_size = len(fleet_grid)
+        try:
+            computer_fleet = cf.generate_fleet_grid(grid_size, ships, sizes)
+        except ValueError as error:
+            return ['ERROR {0}'.format(error)]
+        self.player = GameState(computer_fleet, ships, sizes)
+        self.computer = GameState(fleet_grid, ships, sizes)
+        self.computer_move = simulate.start_strategy(self.strategy, sizes)
+        return ['OK game started on a {0} by {0} grid'.format(grid_size)]
+
+    def move(self, row: str, col: str) -> List[str]:
+        """
+        Make the player's move at row and col (as text) and the computer's
+        reply, and return the reply lines.
+        """
+
+        if self.player is None:
+            return ['ERROR no game started']
+        if self.player.is_win() or self.computer.is_win():
+            return ['ERROR the game is over']
+
+        move = parse_player_move(row, col, self.player.target_grid)
+        if move is None:
+            return ['ERROR Invalid move!']
+
+        reply = []
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            result = self.player.make_move(move[0], move[1])
+        reply.append('YOU ' + result)
+        reply.extend(_captured_lines(output, 'SUNK'))
+        if self.player.is_win():
+            reply.append('WIN You won in {0} move(s)!'.format(
+                self.player.get_num_moves()))
+            return reply
+
+        row, col = self.computer_move(self.computer.target_grid)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            result = self.computer.make_move(row, col)
+        reply.append('COMPUTER {0} {1} {2}'.format(row, col, result))
+        reply.extend(_captured_lines(output, 'SUNK'))
+        if self.computer.is_win():
+            reply.append('LOSE The computer won in {0} move(s).'.format(
+                self.computer.get_num_moves()))
+        return reply
+
+    def grids(self) -> List[str]:
+        """
+        Return the player's grids as display_grids shows them.
+        """
+
+        if self.player is None:
+            return ['ERROR no game started']
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            pb.display_grids(self.player.target_grid,
+                             self.computer.fleet_grid)
+        return ['GRID ' + line for line in output.getvalue().splitlines()]
+
+
+async def handle_connection(reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter,
+                            idle_timeout: float = None,
+                            strategy: Callable = cf.make_computer_move
+                            ) -> None:
+    """
+    Play a Session with the computer strategy (or strategy factory) strategy
+    with the client on reader and writer until it quits, disconnects or is
+    idle for idle_timeout seconds (forever if None). A
+    game file longer than max_game_lines is rejected as soon as it is, and
+    the rest of it is ignored up to its END line.
+    """
+
+    session = Session(strategy)
+    game_lines = None
+    skipping_game = False
+    try:
+        while True:
+            line = await asyncio.wait_for(reader.readline(), idle_timeout)
+            if not line:
+                break
+            words = line.decode('utf-8', 'replace').split()
+
+            if skipping_game:
+                skipping_game = words != ['END']
+                continue
+            elif game_lines is not None:
+                if words == ['END']:
+                    reply = session.start_game(game_lines)
+                    game_lines = None
+                elif len(game_lines) < max_game_lines(game_lines):
+                    game_lines.append(' '.join(words))
+                    continue
+                else:
+                    reply = ['ERROR The supplied game is not valid.']
+                    game_lines = None
+                    skipping_game = True
+            elif words == ['GAME']:
+                game_lines = []
+                continue
+            elif len(words) == 3 and words[0] == 'MOVE':
+                reply = session.move(words[1], words[2])
+            elif words == ['GRIDS']:
+                reply = session.grids()
+            elif words == ['QUIT']:
+                break
+            else:
+                reply = ['ERROR unknown command']
+
+            writer.write(('\n'.join(reply) + '\n.\n').encode('utf-8'))
+            await writer.drain()
+    except (asyncio.TimeoutError, ValueError, ConnectionError):
+        # Idle too long, line too long, or the client went away
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str, port: int, idle_timeout: float = None,
+                strategy: Callable = cf.make_computer_move) -> None:
+    """
+    Serve games against the computer strategy (or strategy factory)
+    strategy on host and port until cancelled.
+    """
+
+    async def handle(reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        await handle_connection(reader, writer, idle_timeout, strategy)
+
+    server = await asyncio.start_server(handle, host, port,
+                                        limit=MAX_LINE_LENGTH)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Run the server with the command line arguments argv.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--idle-timeout', type=float,
+                        help='seconds before an idle connection is closed')
+    parser.add_argument('--strategy',
+                        default='computer_functions:make_computer_move',
+                        help='computer strategy, written as module:function')
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.host, args.port, args.idle_timeout,
+                      simulate.load_strategy(args.strategy)))
+
+
+if __name__ == '__main__':
+    main()
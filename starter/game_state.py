@@ -0,0 +1,148 @@
+"""The state of one player's side of a game, with running counters.
+
+play_battleship counts moves by rescanning the target grid
+(get_num_moves) and checks for a win by comparing the whole hits list after
+every move (is_win). A GameState updates its counters as each move is made,
+so both are constant-time lookups, and finds the ship that was hit with a
+ShipRegistry.
+"""
+
+from typing import Dict, List
+
+import battleship_functions as bf
+import play_battleship as pb
+from ship_registry import NO_SHIP, ShipRegistry
+
+
+class GameState:
+    """The grids and counters of a player shooting at one fleet.
+
+    === Attributes ===
+    fleet_grid: the fleet grid being shot at
+    target_grid: the shooter's target grid for fleet_grid
+    ships: the ship characters
+    sizes: the ship sizes
+    hits_list: hits_list[i] is the number of hits on ships[i]
+    moves: the number of moves made
+    hits: the number of moves that hit a ship
+    misses: the number of moves that missed
+    remaining_ships: the number of ships not sunk yet
+    registry: the ship in each cell of fleet_grid
+    """
+
+    def __init__(self, fleet_grid: List[List[str]], ships: List[str],
+                 sizes: List[int]) -> None:
+        self.fleet_grid = fleet_grid
+        self.target_grid = pb.get_target_grid(len(fleet_grid))
+        self.ships = ships
+        self.sizes = sizes
+        self.hits_list = [0] * len(sizes)
+        self.moves = 0
+        self.hits = 0
+        self.misses = 0
+        self.remaining_ships = len(ships)
+        self.registry = ShipRegistry(ships, sizes, fleet_grid)
+
+    def make_move(self, row: int, col: int) -> str:
+        """
+        Return the result of play_battleship.make_move for a shot at row and
+        col, and update the grids and counters. The ship that was hit is
+        found with the registry rather than by searching ships. Raise
+        ValueError if the cell is not a valid UNKNOWN cell of the target
+        grid.
+
+        >>> state = GameState([['.', 'a'], ['.', 'a']], ['a'], [2])
+        >>> state.make_move(0, 0)
+        'missed'
+        >>> state.make_move(0, 1)
+        'hit a ship'
+        >>> state.is_win()
+        False
+        >>> state.make_move(1, 1)
+        The size 2 a ship has been sunk!
+        'hit a ship'
+        >>> state.is_win()
+        True
+        >>> state.get_stats()
+        {'moves': 3, 'hits': 2, 'misses': 1, 'remaining_ships': 0}
+        >>> state.make_move(1, 1)
+        Traceback (most recent call last):
+        ValueError: cell (1, 1) has already been shot
+        """
+
+        if not bf.is_valid_cell(row, col, len(self.target_grid)):
+            raise ValueError('cell ({0}, {1}) is not on the grid'.format(
+                row, col))
+        if bf.is_not_given_char(row, col, self.target_grid, bf.UNKNOWN):
+            raise ValueError('cell ({0}, {1}) has already been shot'.format(
+                row, col))
+
+        ship_id = self.registry.ship_at(row, col)
+        self.moves = self.moves + 1
+        if ship_id == NO_SHIP:
+            bf.update_target_grid(row, col, self.target_grid, self.fleet_grid)
+            self.misses = self.misses + 1
+            return 'missed'
+
+        self.registry.update_fleet_grid(row, col, self.fleet_grid,
+                                        self.hits_list)
+        bf.update_target_grid(row, col, self.target_grid, self.fleet_grid)
+        self.hits = self.hits + 1
+        if self.hits_list[ship_id] == self.sizes[ship_id]:
+            self.remaining_ships = self.remaining_ships - 1
+        return 'hit a ship'
+
+    def is_win(self) -> bool:
+        """
+        Return True iff every ship has been sunk.
+        """
+
+        return self.remaining_ships == 0
+
+    def get_num_moves(self) -> int:
+        """
+        Return the number of moves made so far.
+        """
+
+        return self.moves
+
+    def copy(self) -> 'GameState':
+        """
+        Return a copy of this state that can be played on independently. The
+        registry is shared, since it does not change during a game.
+
+        >>> state = GameState([['.', 'a'], ['.', 'a']], ['a'], [2])
+        >>> other = state.copy()
+        >>> other.make_move(0, 1)
+        'hit a ship'
+        >>> state.fleet_grid, other.fleet_grid
+        ([['.', 'a'], ['.', 'a']], [['.', 'A'], ['.', 'a']])
+        """
+
+        other = GameState.__new__(GameState)
+        other.fleet_grid = [row[:] for row in self.fleet_grid]
+        other.target_grid = [row[:] for row in self.target_grid]
+        other.ships = self.ships
+        other.sizes = self.sizes
+        other.hits_list = self.hits_list[:]
+        other.moves = self.moves
+        other.hits = self.hits
+        other.misses = self.misses
+        other.remaining_ships = self.remaining_ships
+        other.registry = self.registry
+        return other
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Return the move, hit and miss counts and the number of remaining
+        ships.
+        """
+
+        return {'moves': self.moves, 'hits': self.hits,
+                'misses': self.misses,
+                'remaining_ships': self.remaining_ships}
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
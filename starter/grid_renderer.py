@@ -0,0 +1,143 @@
+"""Render the display_grids frame as one string and write it in one call.
+
+play_battleship.display_grids prints every cell with its own print call.
+render_grids builds the same text in a single pass, and a GridRenderer
+writes each frame with a single write, in one of three modes:
+
+    PLAIN      the whole frame, exactly as display_grids prints it
+    ANSI_DIFF  the whole first frame, then only the cells that changed,
+               using ANSI escape codes to move the cursor to them
+    QUIET      nothing, for headless runs
+"""
+
+import sys
+from typing import List, TextIO
+
+import battleship_functions as bf
+
+PLAIN = 'plain'
+ANSI_DIFF = 'ansi-diff'
+QUIET = 'quiet'
+
+# The lines of the frame before the first grid row
+_HEADER_LINES = 4
+
+
+def render_grids(target_grid: List[List[str]],
+                 fleet_grid: List[List[str]]) -> str:
+    """
+    Return the text display_grids prints for target_grid and fleet_grid.
+
+    >>> print(render_grids([['-', 'M'], ['X', '-']], [['.', 'a'], ['.', 'A']]),
+    ...       end='')
+    <BLANKLINE>
+    My target grid.               My fleet grid.
+    <BLANKLINE>
+     01                           01
+    0-M                          0.a
+    1X-                          1.A
+    <BLANKLINE>
+     X means hit,                Upper-case means hit.
+     M means miss.
+    """
+
+    gap_between_grids = ' ' * (28 - len(target_grid))
+    columns = ''.join([str(col) for col in range(len(target_grid))])
+
+    lines = ['', 'My target grid.               My fleet grid.', '',
+             ' ' + columns + gap_between_grids + ' ' + columns]
+    for row in range(len(target_grid)):
+        lines.append(str(row) + ''.join(target_grid[row]) +
+                     gap_between_grids + str(row) + ''.join(fleet_grid[row]))
+    lines.append('')
+    lines.append(' ' + bf.HIT + ' means hit,                '
+                 'Upper-case means hit.')
+    lines.append(' ' + bf.MISS + ' means miss.')
+    return '\n'.join(lines) + '\n'
+
+
+class GridRenderer:
+    """Writes display_grids frames to a stream, one write per frame.
+
+    === Attributes ===
+    stream: where the frames are written
+    mode: PLAIN, ANSI_DIFF or QUIET
+    """
+
+    def __init__(self, stream: TextIO = None, mode: str = PLAIN) -> None:
+        if mode not in (PLAIN, ANSI_DIFF, QUIET):
+            raise ValueError('unknown render mode {0!r}'.format(mode))
+        if stream is None:
+            stream = sys.stdout
+        self.stream = stream
+        self.mode = mode
+        self._previous = None
+
+    def display_grids(self, target_grid: List[List[str]],
+                      fleet_grid: List[List[str]]) -> None:
+        """
+        Display target_grid and fleet_grid, like
+        play_battleship.display_grids, according to mode.
+
+        >>> import io
+        >>> stream = io.StringIO()
+        >>> renderer = GridRenderer(stream, ANSI_DIFF)
+        >>> renderer.display_grids([['-', '-'], ['-', '-']],
+        ...                        [['.', 'a'], ['.', 'a']])
+        >>> _ = stream.seek(0); _ = stream.truncate()
+        >>> renderer.display_grids([['-', 'X'], ['-', '-']],
+        ...                        [['.', 'A'], ['.', 'a']])
+        >>> stream.getvalue()
+        '\\x1b[5;3HX\\x1b[5;32HA\\x1b[10;1H'
+        """
+
+        if self.mode == QUIET:
+            return
+        if self.mode == PLAIN:
+            self.stream.write(render_grids(target_grid, fleet_grid))
+            return
+
+        rows = [''.join(target_grid[row]) + ''.join(fleet_grid[row])
+                for row in range(len(target_grid))]
+        if self._previous is None or len(self._previous) != len(rows):
+            frame = '\x1b[H\x1b[2J' + render_grids(target_grid, fleet_grid)
+        else:
+            frame = self._render_changes(rows)
+        self._previous = rows
+        self.stream.write(frame)
+        self.stream.flush()
+
+    def _render_changes(self, rows: List[str]) -> str:
+        """
+        Return the escape codes and characters that update the cells that
+        differ between rows and the previous frame, and then put the cursor
+        below the frame. Each row has the target grid row followed by the
+        fleet grid row.
+        """
+
+        grid_size = len(rows)
+        gap = max(28 - grid_size, 0)
+        parts = []
+        for row in range(grid_size):
+            if rows[row] == self._previous[row]:
+                continue
+            label = len(str(row))
+            line = _HEADER_LINES + row + 1
+            old = self._previous[row]
+            new = rows[row]
+            for i in range(len(new)):
+                if new[i] != old[i]:
+                    if i < grid_size:
+                        column = label + i + 1
+                    else:
+                        column = 2 * label + gap + i + 1
+                    parts.append('\x1b[{0};{1}H{2}'.format(line, column,
+                                                             new[i]))
+
+        parts.append('\x1b[{0};1H'.format(_HEADER_LINES + grid_size + 4))
+        return ''.join(parts)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
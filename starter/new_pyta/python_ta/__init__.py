@@ -21,7 +21,11 @@ try:
 except AttributeError:
     pass
 
+import contextlib
+import functools
 import importlib.util
+import io
+import multiprocessing
 import os
 import sys
 import tokenize
@@ -33,29 +37,45 @@ from pylint.config import VALIDATORS, _call_validator
 
 from astroid import modutils, MANAGER
 
-from .reporters import REPORTERS
+from . import result_cache
+from .reporters import REPORTERS, PlainReporter
+from .reporters.node_printers import NodePosition
+from .reporters.plain_reporter import NewMessage
 from .patches import patch_all
 
+__version__ = '1.4.2'
+
 HELP_URL = 'http://www.cs.toronto.edu/~david/pyta/'
 
+# Preconfigured linters used by batch mode, by _linter_pool_key.
+_LINTER_POOL = {}
+
+# Whether patch_all has already monkeypatched pylint in this process.
+_PATCHED = False
+
 # check the python version
 if sys.version_info < (3, 7, 0):
     print('[WARNING] You need Python 3.7 or later to run PythonTA.')
 
 
-def check_errors(module_name='', config='', output=None):
+def check_errors(module_name='', config='', output=None, batch=False,
+                 parallel=False, processes=None, cache=None):
     """Check a module for errors, printing a report."""
     return _check(module_name=module_name, level='error', local_config=config,
-                  output=output)
+                  output=output, batch=batch, parallel=parallel,
+                  processes=processes, cache=cache)
 
 
-def check_all(module_name='', config='', output=None):
+def check_all(module_name='', config='', output=None, batch=False,
+              parallel=False, processes=None, cache=None):
     """Check a module for errors and style warnings, printing a report."""
     return _check(module_name=module_name, level='all', local_config=config,
-                  output=output)
+                  output=output, batch=batch, parallel=parallel,
+                  processes=processes, cache=cache)
 
 
-def _check(module_name='', level='all', local_config='', output=None):
+def _check(module_name='', level='all', local_config='', output=None,
+           batch=False, parallel=False, processes=None, cache=None):
     """Check a module for problems, printing a report.
 
     The `module_name` can take several inputs:
@@ -65,33 +85,71 @@ def _check(module_name='', level='all', local_config='', output=None):
     `level` is used to specify which checks should be made.
     `local_config` is a dict of config options or string (config file name).
     `output` is an absolute path to capture pyta data output. Default std out.
+    `batch` reuses a pooled linter for every file with the same config, and
+    keeps astroid's cache of library modules between files and calls. Use it
+    when checking many files (e.g. student submissions) in one process.
+    `parallel` lints the files in a pool of `processes` worker processes
+    (default: one per CPU), each keeping warm linters as in batch mode. The
+    report is the same as a serial run's, in the same file order.
+    `cache` is a directory of saved lint results (see result_cache). A file
+    whose source, config and python_ta version match a saved result is
+    reported from it without being linted.
     """
-    MANAGER.clear_cache()
+    batch = batch or parallel
+    if not batch:
+        MANAGER.clear_cache()
 
-    # Add reporters to an internal pylint data structure, for use with setting
-    # custom pyta options in a Tuple, before (re)setting reporter.
-    for reporter in REPORTERS:
-        VALIDATORS[reporter.__name__] = reporter
-    linter = reset_linter(config=local_config)
+    _prepare_pylint()
+    if batch:
+        linter = get_pooled_linter(config=local_config)
+    else:
+        linter = reset_linter(config=local_config)
 
     current_reporter = reset_reporter(linter, output)
-    patch_all()  # Monkeypatch pylint (override certain methods)
 
     # Try to check file, issue error message for invalid files.
     try:
+        if parallel:
+            _check_in_parallel(current_reporter, module_name, level,
+                               local_config, processes, cache)
+            current_reporter.output_blob()
+            return current_reporter
         for locations in _get_valid_files_to_check(current_reporter, module_name):
             for file_py in get_file_paths(locations):
                 if not _verify_pre_check(file_py):
                     continue  # Check the other files
-                # Load config file in user location. Construct new linter each
-                # time, so config options don't bleed to unintended files.
-                linter = reset_linter(config=local_config, file_linted=file_py)
+                if cache is not None:
+                    key = _cache_key(local_config, file_py)
+                    messages = result_cache.load_messages(cache, key, file_py)
+                    if messages is not None:
+                        _report_messages(current_reporter, local_config,
+                                         file_py, messages, level)
+                        continue
+                if batch:
+                    # Reuse the linter for this file's config; only the
+                    # per-file state is reset.
+                    linter = get_pooled_linter(config=local_config,
+                                               file_linted=file_py)
+                    linter.msg_status = 0
+                else:
+                    # Load config file in user location. Construct new linter
+                    # each time, so config options don't bleed to unintended
+                    # files.
+                    linter = reset_linter(config=local_config,
+                                          file_linted=file_py)
                 # Assume the local config will NOT set a new reporter.
                 linter.set_reporter(current_reporter)
                 current_reporter.register_file(file_py)
                 linter.check(file_py)  # Lint !
+                if cache is not None:
+                    result_cache.save_messages(
+                        cache, key, current_reporter._error_messages +
+                        current_reporter._style_messages,
+                        current_reporter._source_lines)
                 current_reporter.print_messages(level)
                 current_reporter.reset_messages()  # Clear lists for any next file.
+                if batch:
+                    _forget_user_modules()
         current_reporter.output_blob()
         return current_reporter
     except Exception as e:
@@ -100,6 +158,101 @@ def _check(module_name='', level='all', local_config='', output=None):
         raise e
 
 
+def _prepare_pylint():
+    """Register the pyta reporters and monkeypatch pylint, once per process.
+    """
+    global _PATCHED
+    # Add reporters to an internal pylint data structure, for use with setting
+    # custom pyta options in a Tuple, before (re)setting reporter.
+    for reporter in REPORTERS:
+        VALIDATORS[reporter.__name__] = reporter
+    if not _PATCHED:
+        patch_all()  # Monkeypatch pylint (override certain methods)
+        _PATCHED = True
+
+
+def _check_in_parallel(current_reporter, module_name, level, local_config,
+                       processes, cache):
+    """Lint the files of `module_name` in a process pool, and report their
+    messages with `current_reporter` in the original file order.
+    """
+    files = [file_py
+             for locations in _get_valid_files_to_check(current_reporter,
+                                                        module_name)
+             for file_py in get_file_paths(locations)]
+    tasks = [[file_py, local_config, cache] for file_py in files]
+    with multiprocessing.Pool(processes, initializer=_prepare_pylint) as pool:
+        # imap returns the results in the order of the files.
+        for file_py, result in zip(files, pool.imap(_lint_in_worker, tasks)):
+            pre_check_output, passed, messages = result
+            print(pre_check_output, end='')
+            if not passed:
+                continue  # Check the other files
+            _report_messages(current_reporter, local_config, file_py,
+                             messages, level)
+
+
+def _report_messages(current_reporter, local_config, file_py, messages,
+                     level):
+    """Report `messages`, found without linting in this process, for the
+    file `file_py` as if it had just been linted.
+    """
+    linter = get_pooled_linter(config=local_config, file_linted=file_py)
+    linter.set_reporter(current_reporter)
+    current_reporter.register_file(file_py)
+    for msg in messages:
+        current_reporter.handle_message(msg)
+    current_reporter.print_messages(level)
+    current_reporter.reset_messages()  # Clear lists for any next file.
+
+
+def _cache_key(local_config, file_py):
+    """Return the result cache key for linting `file_py` with `local_config`.
+    """
+    options = local_config if isinstance(local_config, dict) else None
+    return result_cache.cache_key(file_py,
+                                  _resolve_config(local_config, file_py),
+                                  options, __version__)
+
+
+def _lint_in_worker(task):
+    """Lint the file of `task`, a [file path, local config, cache] list,
+    with this worker's pooled linter, or load its messages from the cache.
+
+    Return the output of the pre-check, whether it passed, and the messages
+    (with their nodes replaced by NodePositions, so they can be pickled).
+    """
+    file_py, local_config, cache = task
+    pre_check_output = io.StringIO()
+    with contextlib.redirect_stdout(pre_check_output):
+        passed = _verify_pre_check(file_py)
+    if not passed:
+        return [pre_check_output.getvalue(), False, []]
+    if cache is not None:
+        key = _cache_key(local_config, file_py)
+        messages = result_cache.load_messages(cache, key, file_py)
+        if messages is not None:
+            return [pre_check_output.getvalue(), True, messages]
+
+    # Only the parent prints; drop the worker's config loading notices.
+    with contextlib.redirect_stdout(io.StringIO()):
+        linter = get_pooled_linter(config=local_config, file_linted=file_py)
+        linter.msg_status = 0
+        reporter = PlainReporter()
+        linter.set_reporter(reporter)
+        linter.check(file_py)
+        _forget_user_modules()
+    messages = [msg._replace(node=NodePosition(msg.node))
+                if isinstance(msg, NewMessage) and msg.node is not None
+                else msg
+                for msg in reporter._error_messages + reporter._style_messages]
+    if cache is not None:
+        with open(file_py, encoding='utf-8') as f:
+            source_lines = [line.rstrip() for line in f.readlines()]
+        result_cache.save_messages(cache, key, messages, source_lines)
+    return [pre_check_output.getvalue(), True, messages]
+
+
 def _find_local_config(curr_dir):
     """Search for a `.pylintrc` configuration file provided in same (user)
     location as the source file to check.
@@ -115,6 +268,63 @@ def _find_local_config(curr_dir):
         return os.path.join(curr_dir, 'pylintrc')
 
 
+def _resolve_config(config=None, file_linted=None):
+    """Return the absolute path to the config file that reset_linter would
+    load for `config` and `file_linted`.
+    """
+    if isinstance(config, str) and config != '':
+        return os.path.abspath(config)
+    pylintrc_location = None
+    if file_linted:
+        pylintrc_location = _find_local_config(file_linted)
+    if not pylintrc_location:
+        pylintrc_location = _find_local_config(os.path.dirname(__file__))
+    return os.path.abspath(pylintrc_location)
+
+
+def _linter_pool_key(config=None, file_linted=None):
+    """Return the key of the pooled linter for `config` and `file_linted`:
+    the resolved config file, its modification time, and the dict of config
+    options (if any) applied on top of it.
+    """
+    config_location = _resolve_config(config, file_linted)
+    options = None
+    if isinstance(config, dict):
+        options = repr(sorted(config.items()))
+    return config_location, os.path.getmtime(config_location), options
+
+
+def get_pooled_linter(config=None, file_linted=None):
+    """Return a linter configured as reset_linter(config, file_linted) would
+    be, reusing the one built for the same config file if it has not been
+    modified since.
+    """
+    key = _linter_pool_key(config, file_linted)
+    if key not in _LINTER_POOL:
+        # Drop linters for older versions of the same config.
+        for old_key in [k for k in _LINTER_POOL if k[0] == key[0]]:
+            del _LINTER_POOL[old_key]
+        _LINTER_POOL[key] = reset_linter(config=config, file_linted=file_linted)
+    return _LINTER_POOL[key]
+
+
+def _forget_user_modules():
+    """Remove every module outside the standard library from astroid's cache,
+    so the next file checked (or its local imports) is parsed again.
+    """
+    for modname in list(MANAGER.astroid_cache):
+        if not _is_standard_module(modname.split('.')[0]):
+            del MANAGER.astroid_cache[modname]
+
+
+@functools.lru_cache(maxsize=None)
+def _is_standard_module(modname):
+    """Return whether `modname` is a standard library module, remembering the
+    answer so modutils only searches for each module once.
+    """
+    return modutils.is_standard_module(modname)
+
+
 def _load_config(linter, config_location):
     """Load configuration into the linter."""
     linter.read_config_file(config_location)
@@ -22,6 +22,11 @@ class GlobalVariablesChecker(BaseChecker):
         super().__init__(linter)
         self.import_names = []
 
+    def open(self):
+        """Forget the imports of the previous module, as the same checker is
+        reused across modules."""
+        self.import_names = []
+
     def visit_global(self, node):
         args = "the keyword 'global' is used on line {}".format(node.lineno)
         self.add_message('forbidden-global-variables', node=node, args=args)
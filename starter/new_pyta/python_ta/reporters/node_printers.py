@@ -38,10 +38,10 @@ def render_generic(msg, source_lines=None):
 
 def render_missing_docstring(msg, source_lines=None):
     """Render a missing docstring message."""
-    if isinstance(msg.node, astroid.Module):
+    if _is_node_type(msg.node, astroid.Module):
         yield (None, slice(None, None), LineType.DOCSTRING, '"""YOUR DOCSTRING HERE"""')
         yield from render_context(1, 3, source_lines)
-    elif isinstance(msg.node, astroid.ClassDef) or isinstance(msg.node, astroid.FunctionDef):
+    elif _is_node_type(msg.node, astroid.ClassDef) or _is_node_type(msg.node, astroid.FunctionDef):
         start = msg.node.fromlineno
         end = msg.node.body[0].fromlineno
         yield from render_context(start, end, source_lines)
@@ -93,6 +93,13 @@ def render_type_annotation_return(msg, source_lines=None):
     yield from render_context(end_line + 1, end_line + 3, source_lines)
 
 
+def _is_node_type(node, node_class):
+    """Return whether node, an astroid node or a NodePosition, is a node_class."""
+    if isinstance(node, NodePosition):
+        return node_class.__name__ in node.node_types
+    return isinstance(node, node_class)
+
+
 CUSTOM_MESSAGES = {
     'missing-docstring': render_missing_docstring,
     'trailing-newlines': render_trailing_newlines,
@@ -108,3 +115,40 @@ class LineType(Enum):
     OTHER = 3       # line included in source but not error
     ELLIPSIS = 5    # code replaced with ellipsis
     DOCSTRING = 6   # docstring needed warning
+
+
+class NodePosition:
+    """The type and position of an astroid node, which stands in for the node
+    in messages that are pickled (e.g. sent from a worker process).
+
+    It has the node attributes the renderers use, and `body` holds the
+    position of the node's first statement, if it has one. `node_types` has
+    the names of the node's class and its base classes, so that a check for
+    a node class also matches its subclasses, as isinstance does.
+    """
+    def __init__(self, node, with_body=True):
+        self.node_types = sorted({cls.__name__ for cls in type(node).__mro__})
+        self.lineno = node.lineno
+        self.fromlineno = node.fromlineno
+        self.col_offset = node.col_offset
+        self.end_lineno = getattr(node, 'end_lineno', None)
+        self.end_col_offset = getattr(node, 'end_col_offset', None)
+        body = getattr(node, 'body', None)
+        if with_body and isinstance(body, list) and body:
+            self.body = [NodePosition(body[0], with_body=False)]
+        else:
+            self.body = []
+
+    def to_dict(self):
+        """Return a JSON-serializable dict of this position."""
+        data = dict(vars(self))
+        data['body'] = [position.to_dict() for position in self.body]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Return the NodePosition of a dict made by to_dict."""
+        position = cls.__new__(cls)
+        position.__dict__.update(data)
+        position.body = [cls.from_dict(body) for body in data['body']]
+        return position
@@ -0,0 +1,100 @@
+"""A persistent cache of lint results.
+
+Each entry is a JSON file in the cache directory, named by a hash of the
+source, the config and the python_ta version. It stores every message of the
+file with its node position and snippet, so a cache hit can be replayed to
+any reporter without parsing or inferring anything.
+"""
+import hashlib
+import json
+import os
+
+from pylint.interfaces import CONFIDENCE_LEVELS
+from pylint.utils import Message
+
+from .reporters.node_printers import NodePosition
+from .reporters.plain_reporter import NewMessage, PlainReporter
+
+# Bump when the format of the entries changes.
+CACHE_FORMAT = 2
+
+_CONFIDENCES = {confidence.name: confidence for confidence in CONFIDENCE_LEVELS}
+
+
+def cache_key(filepath, config_location, options, version):
+    """Return the cache key for linting the file at `filepath` with the config
+    file at `config_location`, the dict `options` of config options (or None)
+    and python_ta `version`.
+
+    The file name is part of the key, since some messages mention it.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        digest.update(f.read())
+    with open(config_location, 'rb') as f:
+        digest.update(f.read())
+    digest.update(json.dumps([os.path.basename(filepath), repr(options),
+                              version, CACHE_FORMAT]).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_messages(cache_dir, key, filepath):
+    """Return the cached messages for `key`, with their paths set to the file
+    at `filepath`, or None if there are none.
+    """
+    entry = os.path.join(cache_dir, key + '.json')
+    try:
+        with open(entry, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return [_message_from_dict(msg, filepath) for msg in data['messages']]
+
+
+def save_messages(cache_dir, key, messages, source_lines):
+    """Save `messages` for `key`, with their snippets rendered from
+    `source_lines`.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    snippet_reporter = PlainReporter(source_lines)
+    data = {'messages': [_message_to_dict(msg, snippet_reporter)
+                         for msg in messages]}
+    # Write then rename, so another process never reads half an entry.
+    entry = os.path.join(cache_dir, key + '.json')
+    partial = '{}.{}.tmp'.format(entry, os.getpid())
+    with open(partial, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(partial, entry)
+
+
+def _message_to_dict(msg, snippet_reporter):
+    """Return a JSON-serializable dict of the message `msg`."""
+    data = {'msg_id': msg.msg_id, 'symbol': msg.symbol, 'msg': msg.msg,
+            'confidence': msg.confidence.name, 'module': msg.module,
+            'obj': msg.obj, 'line': msg.line, 'column': msg.column,
+            'node': None, 'snippet': None}
+    if isinstance(msg, NewMessage):
+        if msg.node is not None:
+            node = msg.node
+            if not isinstance(node, NodePosition):
+                node = NodePosition(node)
+            data['node'] = node.to_dict()
+        try:
+            data['snippet'] = msg.snippet or snippet_reporter._build_snippet(msg)
+        except (AttributeError, IndexError):
+            data['snippet'] = ''
+    return data
+
+
+def _message_from_dict(data, filepath):
+    """Return the message of the dict `data` for the file at `filepath`."""
+    location = (os.path.abspath(filepath), filepath, data['module'],
+                data['obj'], data['line'], data['column'])
+    msg = Message(data['msg_id'], data['symbol'], location, data['msg'],
+                  _CONFIDENCES[data['confidence']])
+    if data['snippet'] is None:
+        return msg
+    node = None
+    if data['node'] is not None:
+        node = NodePosition.from_dict(data['node'])
+    return NewMessage(*msg, node, data['snippet'])
@@ -12,14 +12,21 @@ from python_ta.utils import _get_name, _gorg
 
 
 class _TNode:
-    """A node in the TypeConstraints disjoint set data structure."""
+    """A node in the TypeConstraints disjoint set data structure.
+
+    parent_path links the node towards the root of its set's explanation tree,
+    the concrete type of the set if it has one, through the astroid node that
+    caused each unification.
+    """
+    id: int
     type: type
     parent: Optional['_TNode']
-    parent_path: Optional[List[NodeNG]]
+    parent_path: Optional[Tuple['_TNode', NodeNG]]
     adj_list: List[Tuple['_TNode', NodeNG]]
     ast_node: Optional[NodeNG]
 
-    def __init__(self, node_type: type, ast_node: Optional[NodeNG] = None) -> None:
+    def __init__(self, node_type: type, ast_node: Optional[NodeNG] = None, node_id: int = 0) -> None:
+        self.id = node_id
         self.type = node_type
         self.parent = None
         self.parent_path = None
@@ -431,14 +438,29 @@ class TypeConstraints:
 
     This is mainly comprised of a disjoint set data structure, in which each disjoint set
     represents a set of equivalences of type variables and concrete types. The nodes
-    in the disjoint set are implemented by the private class _TNode above.
+    in the disjoint set are implemented by the private class _TNode above, and each
+    _TNode's id indexes the union-find arrays below (union by rank, with path
+    compression), so finding a node's set is nearly constant time.
     """
     # The number of type variables stored in the data structure. Used to generate fresh type variables.
     _count: int
-    # List of _TNodes
+    # List of _TNodes, indexed by id
     _nodes: List[_TNode]
     # A mapping of types to nodes
     type_to_tnode: Dict[str, _TNode]
+    # The union-find parent and rank of each _TNode, by id
+    _set_parent: List[int]
+    _set_rank: List[int]
+    # For the root of each set: its number of nodes, the id of its concrete type
+    # (or None), and the id of the type variable with the greatest name (or None)
+    _set_size: List[int]
+    _set_concrete: List[Optional[int]]
+    _set_max_tvar: List[Optional[int]]
+    # While a checkpoint is open, how to undo each change since the first one, as
+    # (function, *args) tuples; None otherwise
+    _trail: Optional[List[Tuple]]
+    # The number of open checkpoints
+    _checkpoints: int
 
     def __init__(self) -> None:
         self.type_store = None
@@ -447,20 +469,22 @@ class TypeConstraints:
     def __deepcopy__(self, memodict: Dict = {}) -> 'TypeConstraints':
         tc = TypeConstraints()
         tc._count = self._count
-        tc._nodes = []
-        tc.type_to_tnode = {}
         tc.type_store = self.type_store
         # copy nodes without copying edges
-        for node in self._nodes:
-            node_cpy = _TNode(node.type, node.ast_node)
-            tc._nodes.append(node_cpy)
-            tc.type_to_tnode[str(node.type)] = node_cpy
+        tc._nodes = [_TNode(node.type, node.ast_node, node.id) for node in self._nodes]
+        tc.type_to_tnode = {key: tc._nodes[node.id] for key, node in self.type_to_tnode.items()}
         # fill in edges
-        for node in self._nodes:
-            for adj_node, ctx in node.adj_list:
-                tc.type_to_tnode[str(node.type)].adj_list.append((tc.type_to_tnode[str(adj_node.type)], ctx))
+        for node, node_cpy in zip(self._nodes, tc._nodes):
+            node_cpy.adj_list = [(tc._nodes[adj_node.id], ctx) for adj_node, ctx in node.adj_list]
             if node.parent:
-                tc.type_to_tnode[str(node.type)].parent = tc.type_to_tnode[str(node.parent.type)]
+                node_cpy.parent = tc._nodes[node.parent.id]
+            if node.parent_path:
+                node_cpy.parent_path = (tc._nodes[node.parent_path[0].id], node.parent_path[1])
+        tc._set_parent = self._set_parent[:]
+        tc._set_rank = self._set_rank[:]
+        tc._set_size = self._set_size[:]
+        tc._set_concrete = self._set_concrete[:]
+        tc._set_max_tvar = self._set_max_tvar[:]
         return tc
 
     def reset(self) -> None:
@@ -468,6 +492,59 @@ class TypeConstraints:
         self._count = 0
         self._nodes = []
         self.type_to_tnode = {}
+        self._set_parent = []
+        self._set_rank = []
+        self._set_size = []
+        self._set_concrete = []
+        self._set_max_tvar = []
+        self._trail = None
+        self._checkpoints = 0
+
+    ###########################################################################
+    # Checkpoints
+    ###########################################################################
+    def checkpoint(self) -> int:
+        """Start recording changes, and return a checkpoint to pass to rollback or
+        commit. Checkpoints may be nested."""
+        if self._trail is None:
+            self._trail = []
+        self._checkpoints += 1
+        return len(self._trail)
+
+    def rollback(self, checkpoint: int) -> None:
+        """Undo every change made since checkpoint, and close it."""
+        for undo in reversed(self._trail[checkpoint:]):
+            undo[0](*undo[1:])
+        del self._trail[checkpoint:]
+        self._close_checkpoint()
+
+    def commit(self, checkpoint: int) -> None:
+        """Keep the changes made since checkpoint, and close it."""
+        self._close_checkpoint()
+
+    def _close_checkpoint(self) -> None:
+        """Close a checkpoint, and stop recording changes if it was the last one."""
+        self._checkpoints -= 1
+        if self._checkpoints == 0:
+            self._trail = None
+
+    def _set_attr(self, obj: Any, name: str, value: Any) -> None:
+        """Set obj.name to value, recording the change if a checkpoint is open."""
+        if self._trail is not None:
+            self._trail.append((setattr, obj, name, getattr(obj, name)))
+        setattr(obj, name, value)
+
+    def _set_item(self, items: List, index: int, value: Any) -> None:
+        """Set items[index] to value, recording the change if a checkpoint is open."""
+        if self._trail is not None:
+            self._trail.append((list.__setitem__, items, index, items[index]))
+        items[index] = value
+
+    def _append(self, items: List, value: Any) -> None:
+        """Append value to items, recording the change if a checkpoint is open."""
+        if self._trail is not None:
+            self._trail.append((list.pop, items))
+        items.append(value)
 
     ###########################################################################
     # Creating new nodes ("make set")
@@ -476,17 +553,27 @@ class TypeConstraints:
     def fresh_tvar(self, node: Optional[NodeNG] = None) -> TypeVar:
         """Create and return a fresh type variable, associated with the given node."""
         tvar = TypeVar(f'_TV{self._count}')
-        self._count += 1
+        self._set_attr(self, '_count', self._count + 1)
         self._make_set(tvar, ast_node=node)
         return tvar
 
     def _make_set(self, t: type, ast_node: Optional[NodeNG] = None) -> _TNode:
         """Create new set with a single _TNode."""
-        node = _TNode(t, ast_node)
-        self._nodes.append(node)
+        node = _TNode(t, ast_node, len(self._nodes))
+        self._append(self._nodes, node)
+        if self._trail is not None:
+            self._trail.append((dict.__delitem__, self.type_to_tnode, str(t)))
         self.type_to_tnode[str(t)] = node
+        self._append(self._set_parent, node.id)
+        self._append(self._set_rank, 0)
+        self._append(self._set_size, 1)
         if not isinstance(t, TypeVar):
             node.parent = node
+            self._append(self._set_concrete, node.id)
+            self._append(self._set_max_tvar, None)
+        else:
+            self._append(self._set_concrete, None)
+            self._append(self._set_max_tvar, node.id)
         return node
 
     def get_tnode(self, t: type) -> _TNode:
@@ -529,29 +616,81 @@ class TypeConstraints:
             return not isinstance(t, TypeVar)
 
     def find_repr(self, tn: _TNode) -> Optional[_TNode]:
-        """Search, using BFS starting from this _TNode, to find a _TNode that has a parent,
-        or a unique set representative if no parent is found."""
+        """Return the concrete type _TNode of this _TNode's set, or a unique set
+        representative (the type variable with the greatest name) if it has none."""
         return self.find_parent(tn, True)
 
     def find_parent(self, tn: _TNode, find_repr: bool = False) -> Optional[_TNode]:
-        """Search, using BFS starting from this _TNode, to find a _TNode that has a parent."""
+        """Return the concrete type _TNode of this _TNode's set, if it has one."""
         if tn.parent is not None:
             return tn.parent
 
-        goal_tnode = self.find_node(tn, (lambda t: t.parent is not None), find_repr)
+        root = self._find_set(tn.id)
+        if self._set_concrete[root] is not None:
+            return self._nodes[self._set_concrete[root]]
+        elif find_repr and self._set_size[root] > 1:
+            return self._nodes[self._set_max_tvar[root]]
+        return None
 
-        if goal_tnode and goal_tnode.parent:
-            cur_node = goal_tnode
-            while cur_node:
-                next_node = None
-                for e in cur_node.adj_list:
-                    if not e[0].parent_path and not e[0].parent:
-                        e[0].parent = goal_tnode
-                        e[0].parent_path = (cur_node, e[1])
-                        next_node = e[0]
-                cur_node = next_node
+    def _find_set(self, node_id: int) -> int:
+        """Return the id of the root of the set containing the _TNode with node_id,
+        compressing the path to it."""
+        root = node_id
+        while self._set_parent[root] != root:
+            root = self._set_parent[root]
+        while self._set_parent[node_id] != root:
+            next_id = self._set_parent[node_id]
+            self._set_item(self._set_parent, node_id, root)
+            node_id = next_id
+        return root
+
+    def _union(self, tn1: _TNode, tn2: _TNode, ast_node: Optional[NodeNG]) -> None:
+        """Merge the sets of tn1 and tn2, which were unified by ast_node.
+
+        The explanation tree of one set is re-rooted at its node and linked under the
+        other node, keeping the concrete type (if any) at the root of the merged tree.
+        The set with a concrete type keeps it, preferring tn1's set if both have one.
+        """
+        root1, root2 = self._find_set(tn1.id), self._find_set(tn2.id)
+        if root1 == root2:
+            return
 
-        return goal_tnode
+        if self._set_concrete[root1] is None and self._set_concrete[root2] is None:
+            keep_first = self._set_size[root1] >= self._set_size[root2]
+        else:
+            keep_first = self._set_concrete[root1] is not None
+        if keep_first:
+            self._reroot(tn2)
+            self._set_attr(tn2, 'parent_path', (tn1, ast_node))
+            concrete = self._set_concrete[root1]
+        else:
+            self._reroot(tn1)
+            self._set_attr(tn1, 'parent_path', (tn2, ast_node))
+            concrete = self._set_concrete[root2]
+
+        max_tvar = max((self._set_max_tvar[root] for root in (root1, root2)
+                        if self._set_max_tvar[root] is not None),
+                       key=lambda node_id: self._nodes[node_id].type.__name__, default=None)
+        if self._set_rank[root1] < self._set_rank[root2]:
+            root1, root2 = root2, root1
+        elif self._set_rank[root1] == self._set_rank[root2]:
+            self._set_item(self._set_rank, root1, self._set_rank[root1] + 1)
+        self._set_item(self._set_parent, root2, root1)
+        self._set_item(self._set_size, root1, self._set_size[root1] + self._set_size[root2])
+        self._set_item(self._set_concrete, root1, concrete)
+        self._set_item(self._set_max_tvar, root1, max_tvar)
+
+    def _reroot(self, tn: _TNode) -> None:
+        """Make tn the root of its explanation tree by reversing its parent_path chain."""
+        prev = None
+        cur = tn
+        while cur is not None:
+            next_path = cur.parent_path
+            self._set_attr(cur, 'parent_path', prev)
+            if next_path is None:
+                break
+            prev = (cur, next_path[1])
+            cur = next_path[0]
 
     def find_function_def(self, tn: _TNode) -> Optional[astroid.FunctionDef]:
         """Search, using BFS starting from this _TNode, to find a _TNode with a
@@ -585,14 +724,11 @@ class TypeConstraints:
         return goal_tnode
 
     def create_edges(self, tn1: _TNode, tn2: _TNode, ast_node: NodeNG):
-        if tn1 != tn2:
-            edge_exists = False
-            for e in tn1.adj_list:
-                if e[0] == tn2:
-                    edge_exists = True
-            if not edge_exists:
-                tn1.adj_list.append((tn2, ast_node))
-                tn2.adj_list.append((tn1, ast_node))
+        """Record that tn1 and tn2 are equivalent, merging their sets."""
+        if tn1 != tn2 and self._find_set(tn1.id) != self._find_set(tn2.id):
+            self._append(tn1.adj_list, (tn2, ast_node))
+            self._append(tn2.adj_list, (tn1, ast_node))
+            self._union(tn1, tn2, ast_node)
 
     ###########################################################################
     # Type unification ("union")
@@ -622,8 +758,8 @@ class TypeConstraints:
             ct1 = conc_tnode1.type
             ct2 = conc_tnode2.type
             if ct1 == ct2:
-                tnode1.parent = conc_tnode1
-                tnode2.parent = conc_tnode1
+                self._set_attr(tnode1, 'parent', conc_tnode1)
+                self._set_attr(tnode2, 'parent', conc_tnode1)
                 self.create_edges(tnode1, tnode2, ast_node)
                 return TypeInfo(ct1)
             elif getattr(ct1, '__origin__', None) is Union or getattr(ct2, '__origin__', None) is Union:
@@ -651,8 +787,8 @@ class TypeConstraints:
 
         # One type can be resolved
         elif conc_tnode1 is not None:
-            tnode2.parent = conc_tnode1
-            tnode2.parent_path = (tnode1, ast_node)
+            # Merging the sets links tnode2's parent_path to tnode1
+            self._set_attr(tnode2, 'parent', conc_tnode1)
             self.create_edges(tnode1, tnode2, ast_node)
             return TypeInfo(conc_tnode1.type)
         elif conc_tnode2 is not None:
@@ -705,8 +841,11 @@ class TypeConstraints:
     ###########################################################################
     def can_unify(self, t1: type, t2: type) -> bool:
         """Check if the two types can unify without modifying current TypeConstraints."""
-        tc = self.__deepcopy__()
-        return not isinstance(tc.unify(t1, t2, None), TypeFail)
+        checkpoint = self.checkpoint()
+        try:
+            return not isinstance(self.unify(t1, t2, None), TypeFail)
+        finally:
+            self.rollback(checkpoint)
 
     @accept_failable
     def unify_call(self, func_var: type, *arg_types: type, node: Optional[NodeNG] = None) -> TypeResult:
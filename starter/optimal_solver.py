@@ -0,0 +1,469 @@
+"""The minimum expected number of shots to finish a game from a target grid.
+
+Every fleet layout that is still possible (ships in straight, unbroken
+lines that do not overlap, as validate_fleet_grid requires, covering every
+HIT cell and no MISS cell) is taken to be equally likely. Only the cells a
+layout covers matter to the shooter, so layouts are grouped by the mask of
+cells they cover. A layout with every cell HIT would have ended the game,
+so while the game is on those are ruled out too.
+
+The solver searches every shot from each state and keeps the best one,
+memoizing the expected shots of each state in a bounded LRU cache. A state
+is keyed by its HIT and MISS masks in canonical form: the smallest of the
+masks under the eight rotations and reflections of the grid, since the
+layouts of symmetric target grids are symmetric. Two cells covered by
+exactly the same layouts lead to symmetric states, so only one of them is
+searched, and a shot whose lower bound (every layout still needs each of
+its unshot cells shot) is no better than the best found is skipped.
+
+This is exact while the grid is at most EXACT_GRID_SIZE and there are at
+most max_layouts possible layouts; the search grows quickly with the
+number of layouts, so it suits endgames. Otherwise the solver samples
+random layouts instead: the best move is the cell most of them cover, and
+the expected shots are those a DensityTargeter needs against the sampled
+layouts, an estimate from above of the best possible.
+"""
+
+import collections
+import random
+from typing import Dict, List, Tuple
+
+import battleship_functions as bf
+from bitboard import count_bits, placement_table, target_grid_to_bitboard
+from density_targeting import DensityTargeter
+
+# The largest grid the solver tries to solve exactly
+EXACT_GRID_SIZE = 6
+
+# The ship sizes assumed by make_optimal_move: those of game1.txt.
+SOLVER_SIZES = [5, 4, 3, 3, 2]
+
+
+def symmetry_tables(grid_size: int) -> List[List[int]]:
+    """
+    Return, for each of the eight rotations and reflections of a grid_size
+    grid, the list of where each cell index goes.
+
+    >>> symmetry_tables(2)[1]
+    [1, 3, 0, 2]
+    """
+
+    last = grid_size - 1
+    maps = [lambda r, c: [r, c], lambda r, c: [c, last - r],
+            lambda r, c: [last - r, last - c], lambda r, c: [last - c, r],
+            lambda r, c: [r, last - c], lambda r, c: [last - r, c],
+            lambda r, c: [c, r], lambda r, c: [last - c, last - r]]
+    tables = []
+    for cell_map in maps:
+        table = []
+        for cell in range(grid_size * grid_size):
+            row, col = cell_map(cell // grid_size, cell % grid_size)
+            table.append(row * grid_size + col)
+        tables.append(table)
+    return tables
+
+
+def transform_mask(mask: int, table: List[int]) -> int:
+    """
+    Return mask with each cell index i moved to table[i].
+
+    >>> transform_mask(0b0011, [1, 3, 0, 2])
+    10
+    """
+
+    result = 0
+    while mask:
+        low = mask & -mask
+        result |= 1 << table[low.bit_length() - 1]
+        mask ^= low
+    return result
+
+
+class OptimalSolver:
+    """Expected shots and best moves for a fleet with sizes.
+
+    === Attributes ===
+    grid_size: the number of rows (and columns) of the target grid
+    sizes: the ship sizes of the fleet
+    max_layouts: the most layouts the exact search is tried with
+    samples: the number of layouts sampled when the search is not exact
+    max_cache: the most states kept in cache
+    cache: the expected shots of solved states, least recently used first
+    """
+
+    def __init__(self, grid_size: int, sizes: List[int],
+                 max_layouts: int = 40, samples: int = 200,
+                 max_cache: int = 100000, seed: int = 0) -> None:
+        self.grid_size = grid_size
+        self.sizes = sorted(sizes, reverse=True)
+        self.max_layouts = max_layouts
+        self.samples = samples
+        self.max_cache = max_cache
+        self.cache = collections.OrderedDict()
+        self._random = random.Random(seed)
+        self._tables = symmetry_tables(grid_size)
+        self._full = (1 << (grid_size * grid_size)) - 1
+        self._masks = {size: [placement[0] for placement in
+                              placement_table(grid_size, size)]
+                       for size in set(sizes)}
+
+    def _canonical(self, hit: int, miss: int) -> Tuple[int, int]:
+        """
+        Return the smallest (hit, miss) over every symmetry of the grid.
+        """
+
+        return min((transform_mask(hit, table), transform_mask(miss, table))
+                   for table in self._tables)
+
+    def _enumerate(self, hit: int, miss: int) -> Dict[int, int]:
+        """
+        Return the number of possible layouts covering each mask of cells,
+        or None if there are more than max_layouts. Ships of the same size
+        are placed in placement order, so each layout is counted once.
+        """
+
+        layouts = {}
+        found = [0]
+
+        def place(ship: int, first: int, occupied: int) -> bool:
+            if ship == len(self.sizes):
+                if hit & ~occupied:
+                    return True
+                layouts[occupied] = layouts.get(occupied, 0) + 1
+                found[0] += 1
+                return found[0] <= self.max_layouts
+            if count_bits(hit & ~occupied) > sum(self.sizes[ship:]):
+                return True
+            masks = self._masks[self.sizes[ship]]
+            for index in range(first, len(masks)):
+                if not masks[index] & (occupied | miss):
+                    same = ship + 1 < len(self.sizes) and \
+                        self.sizes[ship + 1] == self.sizes[ship]
+                    if not place(ship + 1, index + 1 if same else 0,
+                                 occupied | masks[index]):
+                        return False
+            return True
+
+        if not place(0, 0, 0):
+            return None
+        return layouts
+
+    def _sample_layout(self, hit: int, miss: int, budget: int) -> int:
+        """
+        Return the cells of a random possible layout, or None if none was
+        found within budget placements. Uncovered HIT cells are covered
+        first, so the layouts are not exactly uniform.
+        """
+
+        steps = [budget]
+
+        def place(remaining: List[int], occupied: int) -> int:
+            steps[0] -= 1
+            uncovered = hit & ~occupied
+            if not remaining:
+                return None if uncovered else occupied
+            if steps[0] < 0 or count_bits(uncovered) > sum(remaining):
+                return None
+            if uncovered:
+                cell = uncovered & -uncovered
+                options = [[i, mask] for i in range(len(remaining))
+                           if remaining.index(remaining[i]) == i
+                           for mask in self._masks[remaining[i]]
+                           if mask & cell and not mask & (occupied | miss)]
+            else:
+                options = [[0, mask] for mask in self._masks[remaining[0]]
+                           if not mask & (occupied | miss)]
+            self._random.shuffle(options)
+            for i, mask in options:
+                result = place(remaining[:i] + remaining[i + 1:],
+                               occupied | mask)
+                if result is not None:
+                    return result
+            return None
+
+        return place(self.sizes, 0)
+
+    def _possible_layouts(self, hit: int,
+                          miss: int) -> Tuple[List[Tuple[int, int]], bool]:
+        """
+        Return the (cells, count) of the possible layouts that do not end
+        the game, and whether they are all of them (True) or a sample.
+        """
+
+        layouts = None
+        if self.grid_size <= EXACT_GRID_SIZE:
+            layouts = self._enumerate(hit, miss)
+        exact = layouts is not None
+        if not exact:
+            layouts = {}
+            for _ in range(self.samples):
+                cells = self._sample_layout(hit, miss, 1000)
+                if cells is not None:
+                    layouts[cells] = layouts.get(cells, 0) + 1
+        return [(cells, count) for cells, count in layouts.items()
+                if cells & ~hit], exact
+
+    def _split(self, bit: int, hit: int,
+               layouts: List[Tuple[int, int]]) -> List:
+        """
+        Return [hit_layouts, hit_weight, miss_layouts, miss_weight] for a
+        shot at the cell bit: the layouts that cover it and are not
+        finished by it, and the layouts that do not cover it.
+        """
+
+        hit_layouts = []
+        miss_layouts = []
+        hit_weight = 0
+        miss_weight = 0
+        for cells, count in layouts:
+            if not cells & bit:
+                miss_layouts.append((cells, count))
+                miss_weight += count
+            elif cells & ~(hit | bit):
+                hit_layouts.append((cells, count))
+                hit_weight += count
+        return [hit_layouts, hit_weight, miss_layouts, miss_weight]
+
+    def _candidates(self, hit: int,
+                    layouts: List[Tuple[int, int]]) -> List[int]:
+        """
+        Return one cell bit for each distinct set of layouts covering an
+        unshot cell, or just a cell every layout covers if there is one:
+        it has to be shot in every case, so shooting it first is best.
+        """
+
+        signatures = {}
+        for i in range(len(layouts)):
+            cells = layouts[i][0] & ~hit
+            while cells:
+                low = cells & -cells
+                signatures[low] = signatures.get(low, 0) | (1 << i)
+                cells ^= low
+        everything = (1 << len(layouts)) - 1
+        candidates = {}
+        for bit, signature in signatures.items():
+            if signature == everything:
+                return [bit]
+            candidates.setdefault(signature, bit)
+        return list(candidates.values())
+
+    def _expected(self, hit: int, miss: int, layouts: List[Tuple[int, int]],
+                  cutoff: float = float('inf')) -> List:
+        """
+        Return [the minimum expected shots to finish the game from the state
+        with hit, miss and its possible layouts, True] if it is less than
+        cutoff. Otherwise return [a lower bound on it that is at least
+        cutoff, False].
+        """
+
+        if len(layouts) == 1:
+            return [count_bits(layouts[0][0] & ~hit), True]
+
+        # Unshot cells no layout covers are as good as MISS cells
+        covered = 0
+        for cells, _ in layouts:
+            covered |= cells
+        key = self._canonical(hit, ~(hit | covered) & self._full)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            value, exact = self.cache[key]
+            if exact or value >= cutoff:
+                return [value, exact]
+
+        value, bit = self._best_shot(hit, miss, layouts, cutoff)
+
+        self.cache[key] = [value, bit is not None]
+        if len(self.cache) > self.max_cache:
+            self.cache.popitem(last=False)
+        return [value, bit is not None]
+
+    def _best_shot(self, hit: int, miss: int, layouts: List[Tuple[int, int]],
+                   cutoff: float = float('inf')) -> List:
+        """
+        Return [expected shots, cell bit] of the best shot from the state
+        with hit, miss and its possible layouts, if its expected shots are
+        less than cutoff, and [cutoff, None] otherwise.
+        """
+
+        total = sum(count for _, count in layouts)
+        options = []
+        for bit in self._candidates(hit, layouts):
+            split = self._split(bit, hit, layouts)
+            bound = 1.0 + (_remaining(hit | bit, split[0]) +
+                           _remaining(hit, split[2])) / total
+            options.append([bound, bit, split])
+        options.sort(key=lambda option: option[0])
+
+        best = [cutoff, None]
+        for bound, bit, split in options:
+            if bound >= best[0]:
+                break
+            hit_layouts, hit_weight, miss_layouts, miss_weight = split
+            hit_chance = hit_weight / total
+            miss_chance = miss_weight / total
+            miss_bound = 0.0
+            if miss_layouts:
+                miss_bound = _remaining(hit, miss_layouts) / miss_weight
+
+            value = 1.0
+            if hit_layouts:
+                # The hit side must be small enough to leave room for the
+                # least the miss side can need
+                expected, exact = self._expected(
+                    hit | bit, miss, hit_layouts,
+                    (best[0] - 1.0 - miss_chance * miss_bound) / hit_chance)
+                if not exact:
+                    continue
+                value += hit_chance * expected
+            if miss_layouts:
+                expected, exact = self._expected(
+                    hit, miss | bit, miss_layouts,
+                    (best[0] - value) / miss_chance)
+                if not exact:
+                    continue
+                value += miss_chance * expected
+            if value < best[0]:
+                best = [value, bit]
+        return best
+
+    def _likeliest_cell(self, hit: int,
+                        layouts: List[Tuple[int, int]]) -> int:
+        """
+        Return the bit of the unshot cell covered by the most layouts.
+        """
+
+        weights = {}
+        for cells, count in layouts:
+            cells = cells & ~hit
+            while cells:
+                low = cells & -cells
+                weights[low] = weights.get(low, 0) + count
+                cells ^= low
+        return max(weights, key=lambda low: (weights[low], -low))
+
+    def _playout(self, target_grid: List[List[str]], hit: int,
+                 layouts: List[Tuple[int, int]]) -> float:
+        """
+        Return the mean shots a DensityTargeter needs to finish the game
+        from target_grid when the fleet covers each of layouts.
+        """
+
+        total = 0
+        weight = 0
+        for cells, count in layouts:
+            targeter = DensityTargeter(self.grid_size, self.sizes)
+            targeter.record_target_grid(target_grid)
+            remaining = cells & ~hit
+            shots = 0
+            while remaining:
+                row, col = targeter.choose_move()
+                bit = 1 << (row * self.grid_size + col)
+                if cells & bit:
+                    targeter.record_shot(row, col, bf.HIT)
+                    remaining &= ~bit
+                else:
+                    targeter.record_shot(row, col, bf.MISS)
+                shots += 1
+            total += shots * count
+            weight += count
+        return total / weight
+
+    def solve(self, target_grid: List[List[str]],
+              estimate: bool = True) -> List:
+        """
+        Return [expected shots, best move, exact] for target_grid, where
+        best move is [row, col] (None if the game is over) and exact says
+        whether the result is exact or from sampled layouts. If estimate is
+        False, sampled results skip the playouts and expected shots is None.
+        If no layout could be sampled, the move is a DensityTargeter's and
+        expected shots is None. Raise ValueError if no layout is possible.
+
+        >>> solver = OptimalSolver(3, [2])
+        >>> solver.solve([['-', 'M', '-'], ['M', 'X', 'M'], ['-', 'M', '-']])
+        Traceback (most recent call last):
+        ...
+        ValueError: no fleet layout is possible on this target grid
+        >>> solver.solve([['X', '-', '-'], ['M', '-', '-'], ['-', '-', '-']])
+        [1.0, [0, 1], True]
+        >>> OptimalSolver(2, [2]).solve([['-', '-'], ['-', '-']])[0]
+        3.0
+        """
+
+        target = target_grid_to_bitboard(target_grid)
+        hit = target.hit_mask
+        miss = target.miss_mask
+        if count_bits(hit) >= sum(self.sizes):
+            return [0.0, None, True]
+
+        layouts, exact = self._possible_layouts(hit, miss)
+        expected = None
+        if exact:
+            if not layouts:
+                raise ValueError('no fleet layout is possible on this '
+                                 'target grid')
+            expected, bit = self._best_shot(hit, miss, layouts)
+        elif layouts:
+            bit = self._likeliest_cell(hit, layouts)
+            if estimate:
+                expected = self._playout(target_grid, hit, layouts)
+        else:
+            targeter = DensityTargeter(self.grid_size, self.sizes)
+            targeter.record_target_grid(target_grid)
+            return [None, targeter.choose_move(), False]
+
+        cell = bit.bit_length() - 1
+        return [expected, [cell // self.grid_size, cell % self.grid_size],
+                exact]
+
+    def expected_shots(self, target_grid: List[List[str]]) -> float:
+        """
+        Return the expected shots to finish the game from target_grid.
+        """
+
+        return self.solve(target_grid)[0]
+
+    def best_move(self, target_grid: List[List[str]]) -> List[int]:
+        """
+        Return the [row, col] of the best move on target_grid.
+        """
+
+        return self.solve(target_grid, estimate=False)[1]
+
+
+def _remaining(hit: int, layouts: List[Tuple[int, int]]) -> int:
+    """
+    Return the total unshot cells of layouts, each times its count.
+    """
+
+    return sum(count_bits(cells & ~hit) * count for cells, count in layouts)
+
+
+# The solver used by make_optimal_move, by grid size
+_solvers = {}  # type: Dict[int, OptimalSolver]
+
+
+def make_optimal_move(target_grid: List[List[str]]) -> List[int]:
+    """
+    Return the row and column of the computer's next move on target_grid,
+    chosen by an OptimalSolver for a fleet with SOLVER_SIZES (those that fit
+    the grid).
+
+    >>> make_optimal_move([['X', 'X', 'X'], ['X', 'X', 'X'], ['X', '-', 'M']])
+    [2, 1]
+    """
+
+    grid_size = len(target_grid)
+    if grid_size not in _solvers:
+        sizes = [size for size in SOLVER_SIZES if size <= grid_size]
+        if not sizes:
+            sizes = [1]
+        _solvers[grid_size] = OptimalSolver(grid_size, sizes)
+    move = _solvers[grid_size].best_move(target_grid)
+    if move is None:
+        raise ValueError('the game is over')
+    return move
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,304 @@
+"""A compact binary log of battleship games, and fast replay of any turn.
+
+A GameLog records the initial fleet grids of a game, its seed and every
+move as one packed integer, (fleet index * n * n) + row * n + col, where the
+fleet index says which fleet the move was shot at. A log file is a sequence
+of logs, each written as:
+
+    magic      4 bytes, b'BSLG'
+    version    uint8
+    length     uint32, the number of bytes that follow
+    grid_size  uint16
+    fleets     uint8, the number of fleet grids
+    seed       int64
+    ships      uint16 count, then each ship as a uint8 length and UTF-8
+    sizes      uint16 each
+    grids      grid_size * grid_size ship codes per fleet, 0 for EMPTY and
+               i + 1 for ships[i], as uint8 (or uint16 for over 255 ships)
+    moves      uint32 count, then the packed moves as uint16 (or uint32 if
+               they do not fit)
+
+All numbers are little-endian. A Replayer rebuilds the game states after
+any turn from the nearest of its periodic snapshots.
+"""
+
+import array
+import contextlib
+import os
+import struct
+import sys
+from typing import BinaryIO, Iterator, List
+
+import battleship_functions as bf
+from game_state import GameState
+
+MAGIC = b'BSLG'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBI')
+_GAME = struct.Struct('<HBqH')
+_COUNT = struct.Struct('<I')
+
+
+def _pack_array(typecode: str, values: List[int]) -> bytes:
+    """
+    Return values packed as a little-endian array of typecode.
+    """
+
+    packed = array.array(typecode, values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack_array(typecode: str, data: bytes) -> array.array:
+    """
+    Return the little-endian array of typecode packed in data.
+    """
+
+    unpacked = array.array(typecode)
+    unpacked.frombytes(data)
+    if sys.byteorder == 'big':
+        unpacked.byteswap()
+    return unpacked
+
+
+def _typecode(largest: int) -> str:
+    """
+    Return the array typecode for unsigned values up to largest: 'B', 'H' or
+    'I'.
+
+    >>> _typecode(255), _typecode(256), _typecode(70000)
+    ('B', 'H', 'I')
+    """
+
+    if largest <= 0xff:
+        return 'B'
+    if largest <= 0xffff:
+        return 'H'
+    return 'I'
+
+
+class GameLog:
+    """The initial fleet grids, seed and moves of a game.
+
+    === Attributes ===
+    ships: the ship characters
+    sizes: the ship sizes
+    fleet_grids: the fleet grids before any move
+    seed: the seed the game was played with
+    moves: the packed moves, in the order they were made
+    """
+
+    def __init__(self, ships: List[str], sizes: List[int],
+                 fleet_grids: List[List[List[str]]], seed: int = 0) -> None:
+        self.ships = ships
+        self.sizes = sizes
+        self.fleet_grids = [[row[:] for row in grid] for grid in fleet_grids]
+        self.seed = seed
+        self.moves = array.array(_typecode(self._cells() *
+                                           len(fleet_grids) - 1))
+
+    def _cells(self) -> int:
+        """
+        Return the number of cells in each fleet grid.
+        """
+
+        return len(self.fleet_grids[0]) ** 2
+
+    def record_move(self, fleet: int, row: int, col: int) -> None:
+        """
+        Record a move at row and col on the fleet grid fleet_grids[fleet].
+
+        >>> log = GameLog(['a'], [1], [[['a', '.'], ['.', '.']]])
+        >>> log.record_move(0, 1, 0)
+        >>> log.get_move(0)
+        [0, 1, 0]
+        """
+
+        grid_size = len(self.fleet_grids[0])
+        self.moves.append(fleet * self._cells() + row * grid_size + col)
+
+    def get_move(self, turn: int) -> List[int]:
+        """
+        Return the [fleet, row, col] of move number turn (from 0).
+        """
+
+        grid_size = len(self.fleet_grids[0])
+        fleet, cell = divmod(self.moves[turn], self._cells())
+        return [fleet, cell // grid_size, cell % grid_size]
+
+    def to_bytes(self) -> bytes:
+        """
+        Return the log in the binary log format.
+        """
+
+        grid_size = len(self.fleet_grids[0])
+        parts = [_GAME.pack(grid_size, len(self.fleet_grids), self.seed,
+                            len(self.ships))]
+        for ship in self.ships:
+            encoded = ship.encode('utf-8')
+            parts.append(struct.pack('<B', len(encoded)) + encoded)
+        parts.append(_pack_array('H', self.sizes))
+
+        codes = {bf.EMPTY: 0}
+        for i in range(len(self.ships)):
+            codes[self.ships[i]] = i + 1
+        code_type = _typecode(len(self.ships))
+        for grid in self.fleet_grids:
+            parts.append(_pack_array(code_type, [codes[cell] for row in grid
+                                                 for cell in row]))
+
+        parts.append(_COUNT.pack(len(self.moves)))
+        parts.append(_pack_array(self.moves.typecode, self.moves))
+
+        body = b''.join(parts)
+        return _HEADER.pack(MAGIC, VERSION, len(body)) + body
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'GameLog':
+        """
+        Return the GameLog in data, which is in the binary log format.
+
+        >>> log = GameLog(['a', 'b'], [2, 1], [[['a', 'a'], ['b', '.']]], 7)
+        >>> log.record_move(0, 1, 1)
+        >>> copy = GameLog.from_bytes(log.to_bytes())
+        >>> copy.ships, copy.sizes, copy.fleet_grids, copy.seed
+        (['a', 'b'], [2, 1], [[['a', 'a'], ['b', '.']]], 7)
+        >>> copy.get_move(0)
+        [0, 1, 1]
+        """
+
+        magic, version, length = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('not a version {0} game log'.format(VERSION))
+
+        offset = _HEADER.size
+        grid_size, fleets, seed, num_ships = _GAME.unpack_from(data, offset)
+        offset += _GAME.size
+
+        ships = []
+        for _ in range(num_ships):
+            ship_length = data[offset]
+            ships.append(data[offset + 1:offset + 1 + ship_length].decode(
+                'utf-8'))
+            offset += 1 + ship_length
+        sizes = _unpack_array('H', data[offset:offset + 2 * num_ships])
+        offset += 2 * num_ships
+
+        characters = [bf.EMPTY] + ships
+        code_type = _typecode(num_ships)
+        cells = grid_size * grid_size
+        code_bytes = cells * array.array(code_type).itemsize
+        fleet_grids = []
+        for _ in range(fleets):
+            codes = _unpack_array(code_type, data[offset:offset + code_bytes])
+            offset += code_bytes
+            fleet_grids.append([[characters[code] for code in
+                                 codes[row * grid_size:(row + 1) * grid_size]]
+                                for row in range(grid_size)])
+
+        log = cls(ships, list(sizes), fleet_grids, seed)
+        num_moves = _COUNT.unpack_from(data, offset)[0]
+        offset += _COUNT.size
+        move_bytes = num_moves * log.moves.itemsize
+        log.moves = _unpack_array(log.moves.typecode,
+                                  data[offset:offset + move_bytes])
+        return log
+
+
+def write_logs(log_file: BinaryIO, logs: Iterator[GameLog]) -> None:
+    """
+    Write every log in logs to log_file.
+    """
+
+    for log in logs:
+        log_file.write(log.to_bytes())
+
+
+def read_logs(log_file: BinaryIO) -> Iterator[GameLog]:
+    """
+    Yield each GameLog in log_file, in order.
+    """
+
+    header = log_file.read(_HEADER.size)
+    while header:
+        if len(header) < _HEADER.size:
+            raise ValueError('truncated game log')
+        length = _HEADER.unpack(header)[2]
+        body = log_file.read(length)
+        if len(body) < length:
+            raise ValueError('truncated game log')
+        yield GameLog.from_bytes(header + body)
+        header = log_file.read(_HEADER.size)
+
+
+class Replayer:
+    """Rebuilds the GameStates of a logged game after any turn.
+
+    The game is played through once, keeping a copy of the states every
+    snapshot_interval moves, so rebuilding a turn plays at most
+    snapshot_interval - 1 moves from the nearest snapshot. Sunk messages are
+    not printed during replay.
+
+    === Attributes ===
+    log: the game being replayed
+    snapshot_interval: the number of moves between snapshots
+    snapshots: snapshots[k] has the states after k * snapshot_interval moves
+    """
+
+    def __init__(self, log: GameLog, snapshot_interval: int = 32) -> None:
+        self.log = log
+        self.snapshot_interval = snapshot_interval
+        self.snapshots = []
+
+        states = [GameState([row[:] for row in grid], log.ships, log.sizes)
+                  for grid in log.fleet_grids]
+        with open(os.devnull, 'w') as devnull, \
+                contextlib.redirect_stdout(devnull):
+            for turn in range(len(log.moves)):
+                if turn % snapshot_interval == 0:
+                    self.snapshots.append([state.copy() for state in states])
+                fleet, row, col = log.get_move(turn)
+                states[fleet].make_move(row, col)
+        if len(log.moves) % snapshot_interval == 0:
+            self.snapshots.append(states)
+
+    def num_turns(self) -> int:
+        """
+        Return the number of moves in the game.
+        """
+
+        return len(self.log.moves)
+
+    def state_at(self, turn: int) -> List[GameState]:
+        """
+        Return the states of every fleet after the first turn moves. The
+        states returned can be changed without affecting the replayer.
+
+        >>> log = GameLog(['a'], [2], [[['a', 'a'], ['.', '.']]])
+        >>> for row, col in [[1, 1], [0, 0], [0, 1]]:
+        ...     log.record_move(0, row, col)
+        >>> replayer = Replayer(log, snapshot_interval=2)
+        >>> replayer.state_at(2)[0].target_grid
+        [['X', '-'], ['-', 'M']]
+        >>> replayer.state_at(3)[0].is_win()
+        True
+        """
+
+        if not 0 <= turn <= len(self.log.moves):
+            raise IndexError('turn {0} is not in the game'.format(turn))
+
+        snapshot = turn // self.snapshot_interval
+        states = [state.copy() for state in self.snapshots[snapshot]]
+        with open(os.devnull, 'w') as devnull, \
+                contextlib.redirect_stdout(devnull):
+            for move in range(snapshot * self.snapshot_interval, turn):
+                fleet, row, col = self.log.get_move(move)
+                states[fleet].make_move(row, col)
+        return states
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,90 @@
+"""Constant-time lookup of the ship in a fleet grid cell.
+
+battleship_functions.update_fleet_grid finds the ship that was hit with
+ships.index, a linear search of the ships, and recognizes the ship by the
+character in the cell. A ShipRegistry gives each ship an integer id and
+maps every ship cell to its id once, when the game is loaded, so a hit and
+its sink check take constant time however many ships there are. Since the
+cell map does not depend on the case of the characters, ship labels
+without an upper-case form also work.
+"""
+
+from typing import Dict, List, Tuple
+
+import battleship_functions as bf
+
+NO_SHIP = -1
+
+
+class ShipRegistry:
+    """The ship ids and the ship in each cell of a fleet grid.
+
+    === Attributes ===
+    ships: the ship characters; the id of ships[i] is i
+    sizes: the ship sizes
+    ids: maps each ship character to its id
+    cell_ships: maps (row, col) of each ship cell to the id of its ship
+    """
+
+    def __init__(self, ships: List[str], sizes: List[int],
+                 fleet_grid: List[List[str]]) -> None:
+        self.ships = ships
+        self.sizes = sizes
+        self.ids = {}
+        for i in range(len(ships)):
+            self.ids[ships[i]] = i
+
+        self.cell_ships = {}  # type: Dict[Tuple[int, int], int]
+        for row in range(len(fleet_grid)):
+            col = 0
+            for cell in fleet_grid[row]:
+                if cell in self.ids:
+                    self.cell_ships[(row, col)] = self.ids[cell]
+                col = col + 1
+
+    def ship_at(self, row: int, col: int) -> int:
+        """
+        Return the id of the ship in the cell at row and col, or NO_SHIP if
+        the cell is EMPTY.
+
+        >>> registry = ShipRegistry(['a', 'b'], [2, 1],
+        ...                         [['.', 'b'], ['a', 'a']])
+        >>> registry.ship_at(1, 0), registry.ship_at(0, 1)
+        (0, 1)
+        >>> registry.ship_at(0, 0) == NO_SHIP
+        True
+        """
+
+        return self.cell_ships.get((row, col), NO_SHIP)
+
+    def update_fleet_grid(self, row: int, col: int,
+                          fleet_grid: List[List[str]],
+                          hits_list: List[int]) -> int:
+        """
+        Record a hit on the ship at row and col, like
+        battleship_functions.update_fleet_grid: convert the cell to
+        upper-case, add the hit to hits_list and print a message if the ship
+        sinks. Return the id of the ship that was hit.
+
+        >>> fleet_grid = [['.', 'b'], ['a', 'a']]
+        >>> hits_list = [0, 0]
+        >>> registry = ShipRegistry(['a', 'b'], [2, 1], fleet_grid)
+        >>> registry.update_fleet_grid(0, 1, fleet_grid, hits_list)
+        The size 1 b ship has been sunk!
+        1
+        >>> fleet_grid, hits_list
+        ([['.', 'B'], ['a', 'a']], [0, 1])
+        """
+
+        ship_id = self.cell_ships[(row, col)]
+        hits_list[ship_id] = hits_list[ship_id] + 1
+        fleet_grid[row][col] = self.ships[ship_id].upper()
+
+        if hits_list[ship_id] == self.sizes[ship_id]:
+            bf.print_sunk_message(self.sizes[ship_id], self.ships[ship_id])
+        return ship_id
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
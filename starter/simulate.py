@@ -0,0 +1,296 @@
+"""Play many computer games without any input or output.
+
+Each game places a fleet with computer_functions.generate_fleet_grid and
+lets a strategy shoot at it until every ship is sunk, using a GameState
+for the rules of play_battleship.make_move. play_with_rules plays the same
+game with the assignment's own make_move, update_fleet_grid and is_win, and
+mismatched_seeds checks that the two agree. Game i is seeded with seed + i,
+so a run can be repeated exactly:
+
+    python simulate.py --games 10000 --strategy computer_functions:make_computer_move
+
+A strategy is a function that takes a target grid and returns the move
+[row, col], or a strategy factory: a function whose strategy_factory
+attribute is True, which takes the ship sizes of a game and returns a
+strategy for that game only. A factory is called at the start of every
+game, so its strategies can keep state and know the fleet they shoot at.
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import multiprocessing
+import os
+import random
+import time
+from typing import BinaryIO, Callable, Dict, Iterable, List
+
+import battleship_functions as bf
+import computer_functions as cf
+import play_battleship as pb
+from game_state import GameState
+from replay import GameLog
+
+# The ships and sizes of game1.txt
+DEFAULT_SHIPS = ['a', 'b', 's', 'd', 'p']
+DEFAULT_SIZES = [5, 4, 3, 3, 2]
+
+
+def load_strategy(name: str) -> Callable:
+    """
+    Return the strategy or strategy factory called name, written as
+    module:function.
+
+    >>> load_strategy('computer_functions:make_computer_move').__name__
+    'make_computer_move'
+    """
+
+    module_name, function_name = name.split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def start_strategy(strategy: Callable, sizes: List[int]) -> Callable:
+    """
+    Return the strategy for a new game against ships with sizes: the one
+    strategy makes if it is a strategy factory, or else strategy itself.
+
+    >>> move = cf.make_computer_move
+    >>> start_strategy(move, [2]) is move
+    True
+    >>> start_strategy(load_strategy(
+    ...     'density_targeting:make_density_strategy'), [2]).sizes
+    [2]
+    """
+
+    if getattr(strategy, 'strategy_factory', False):
+        return strategy(sizes)
+    return strategy
+
+
+def play_game(strategy: Callable, grid_size: int, ships: List[str],
+              sizes: List[int], seed: int, record: bool = False) -> List:
+    """
+    Return the number of moves strategy needed to sink a fleet of ships with
+    sizes on a grid_size grid, and the total seconds spent in strategy,
+    for the game seeded with seed. If record is True, also return the game
+    in the binary format of replay.GameLog. Sunk messages are printed as
+    usual.
+    """
+
+    state, strategy_seconds, log = _play_state(strategy, grid_size, ships,
+                                               sizes, seed, record)
+    if log is not None:
+        return [state.get_num_moves(), strategy_seconds, log.to_bytes()]
+    return [state.get_num_moves(), strategy_seconds]
+
+
+def _play_state(strategy: Callable, grid_size: int, ships: List[str],
+                sizes: List[int], seed: int, record: bool) -> List:
+    """
+    Return the finished GameState of the game play_game plays, the total
+    seconds spent in strategy, and the game's replay.GameLog if record is
+    True or None otherwise.
+    """
+
+    random.seed(seed)
+    state = GameState(cf.generate_fleet_grid(grid_size, ships, sizes),
+                      ships, sizes)
+    log = None
+    if record:
+        log = GameLog(ships, sizes, [state.fleet_grid], seed)
+    start = time.perf_counter()
+    strategy = start_strategy(strategy, sizes)
+    strategy_seconds = time.perf_counter() - start
+
+    while not state.is_win():
+        start = time.perf_counter()
+        row, col = strategy(state.target_grid)
+        strategy_seconds += time.perf_counter() - start
+        try:
+            state.make_move(row, col)
+        except ValueError as error:
+            raise ValueError('{0} in game with seed {1}'.format(error, seed))
+        if log is not None:
+            log.record_move(0, row, col)
+
+    return [state, strategy_seconds, log]
+
+
+def play_with_rules(strategy: Callable, grid_size: int, ships: List[str],
+                    sizes: List[int], seed: int) -> List:
+    """
+    Return the number of moves strategy needed to sink a fleet of ships with
+    sizes on a grid_size grid and the final fleet grid, for the game seeded
+    with seed, played with play_battleship.make_move,
+    battleship_functions.update_fleet_grid and battleship_functions.is_win
+    rather than a GameState. Sunk messages are printed as usual.
+    """
+
+    random.seed(seed)
+    fleet_grid = cf.generate_fleet_grid(grid_size, ships, sizes)
+    target_grid = pb.get_target_grid(grid_size)
+    hits_list = [0] * len(sizes)
+    moves = 0
+    strategy = start_strategy(strategy, sizes)
+
+    while not bf.is_win(sizes, hits_list):
+        row, col = strategy(target_grid)
+        if not bf.is_valid_cell(row, col, grid_size) or \
+           bf.is_not_given_char(row, col, target_grid, bf.UNKNOWN):
+            raise ValueError('invalid move {0} in game with seed {1}'.format(
+                [row, col], seed))
+        pb.make_move(row, col, fleet_grid, ships, sizes, hits_list,
+                     target_grid)
+        moves += 1
+
+    return [moves, fleet_grid]
+
+
+def mismatched_seeds(strategy: Callable, grid_size: int, ships: List[str],
+                     sizes: List[int], seeds: Iterable[int]) -> List[int]:
+    """
+    Return the seeds in seeds whose game ends with a different number of
+    moves or a different fleet grid when played with a GameState than with
+    play_with_rules. Sunk messages are discarded.
+
+    >>> strategy = load_strategy('computer_functions:make_computer_move')
+    >>> mismatched_seeds(strategy, 10, DEFAULT_SHIPS, DEFAULT_SIZES, range(20))
+    []
+    >>> mismatched_seeds(strategy, 6, ['a', 'b'], [4, 3], range(20))
+    []
+    >>> strategy = load_strategy('density_targeting:make_density_strategy')
+    >>> mismatched_seeds(strategy, 8, ['a', 'b', 'c'], [2, 2, 2], range(10))
+    []
+    """
+
+    mismatched = []
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        for seed in seeds:
+            state = _play_state(strategy, grid_size, ships, sizes, seed,
+                                False)[0]
+            expected = play_with_rules(strategy, grid_size, ships, sizes,
+                                       seed)
+            if [state.get_num_moves(), state.fleet_grid] != expected:
+                mismatched.append(seed)
+    return mismatched
+
+
+def _play_games(task: List) -> List[List]:
+    """
+    Return the play_game results for the task [strategy_name, grid_size,
+    ships, sizes, seeds, record], with all output discarded.
+    """
+
+    strategy_name, grid_size, ships, sizes, seeds, record = task
+    strategy = load_strategy(strategy_name)
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        return [play_game(strategy, grid_size, ships, sizes, seed, record)
+                for seed in seeds]
+
+
+def simulate(strategy_name: str, num_games: int, grid_size: int = 10,
+             ships: List[str] = None, sizes: List[int] = None, seed: int = 0,
+             processes: int = None, chunksize: int = 100,
+             log_file: BinaryIO = None) -> Dict:
+    """
+    Play num_games games of the strategy strategy_name (module:function) on
+    grid_size grids with ships and sizes (those of game1.txt by default),
+    using game seeds seed to seed + num_games - 1 and a pool of processes
+    worker processes. If log_file is not None, write a replay.GameLog of
+    each game to it, in seed order. Return the statistics of the run.
+    """
+
+    if ships is None:
+        ships = DEFAULT_SHIPS
+    if sizes is None:
+        sizes = DEFAULT_SIZES
+
+    tasks = []
+    for first in range(seed, seed + num_games, chunksize):
+        seeds = list(range(first, min(first + chunksize, seed + num_games)))
+        tasks.append([strategy_name, grid_size, ships, sizes, seeds,
+                      log_file is not None])
+
+    start = time.perf_counter()
+    results = []
+    with multiprocessing.Pool(processes) as pool:
+        for chunk in pool.imap(_play_games, tasks):
+            results.extend(chunk)
+            if log_file is not None:
+                for result in chunk:
+                    log_file.write(result[2])
+    seconds = time.perf_counter() - start
+
+    return summarize(results, seconds)
+
+
+def summarize(results: List[List], seconds: float) -> Dict:
+    """
+    Return the statistics for the play_game results of a run that took
+    seconds: the moves-to-win distribution and summary, games per second
+    and the mean seconds per strategy call.
+
+    >>> stats = summarize([[3, 0.3], [5, 0.5], [5, 0.5]], 2.0)
+    >>> stats['moves_distribution']
+    {3: 1, 5: 2}
+    >>> stats['moves_median'], stats['games_per_second']
+    (5, 1.5)
+    """
+
+    moves = sorted(result[0] for result in results)
+    distribution = {}
+    for count in moves:
+        distribution[count] = distribution.get(count, 0) + 1
+
+    total_moves = sum(moves)
+    stats = {'games': len(moves), 'seconds': round(seconds, 6),
+             'moves_distribution': distribution}
+    if moves:
+        stats['moves_min'] = moves[0]
+        stats['moves_max'] = moves[-1]
+        stats['moves_mean'] = total_moves / len(moves)
+        stats['moves_median'] = moves[len(moves) // 2]
+    if seconds > 0:
+        stats['games_per_second'] = round(len(moves) / seconds, 1)
+    if total_moves > 0:
+        stats['seconds_per_move'] = \
+            sum(result[1] for result in results) / total_moves
+    return stats
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Run the simulator with the command line arguments argv and print the
+    statistics as JSON.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--strategy',
+                        default='computer_functions:make_computer_move',
+                        help='strategy function, written as module:function')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--grid-size', type=int, default=10)
+    parser.add_argument('--ships', nargs='+', default=DEFAULT_SHIPS)
+    parser.add_argument('--sizes', nargs='+', type=int,
+                        default=DEFAULT_SIZES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--log', help='file to write the game logs to')
+    args = parser.parse_args(argv)
+
+    if args.log is None:
+        stats = simulate(args.strategy, args.games, args.grid_size,
+                         args.ships, args.sizes, args.seed, args.processes)
+    else:
+        with open(args.log, 'wb') as log_file:
+            stats = simulate(args.strategy, args.games, args.grid_size,
+                             args.ships, args.sizes, args.seed,
+                             args.processes, log_file=log_file)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == '__main__':
+    main()
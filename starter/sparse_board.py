@@ -0,0 +1,193 @@
+"""Sparse boards for very large grids with few ships.
+
+A SparseBoard stores only the ship cells and the shots, in dictionaries
+keyed by (row, col), so its size depends on the number of ship cells and
+shots rather than the grid area. Unlike play_battleship, the grid may be
+bigger than MAX_GRID_SIZE.
+"""
+
+import re
+from typing import Dict, List, TextIO, Tuple
+
+import battleship_functions as bf
+
+_SHIP_CELL = re.compile('[^' + re.escape(bf.EMPTY) + ']')
+
+
+class SparseBoard:
+    """A fleet grid, target grid and hits list stored as dictionaries.
+
+    === Attributes ===
+    grid_size: the number of rows (and columns) of the grid
+    ships: the ship characters
+    sizes: the ship sizes
+    ship_cells: maps (row, col) of each ship cell to its character
+    shots: maps (row, col) of each cell shot to HIT or MISS
+    hits_list: hits_list[i] is the number of hits on ships[i]
+    """
+
+    def __init__(self, grid_size: int, ships: List[str], sizes: List[int],
+                 ship_cells: Dict[Tuple[int, int], str]) -> None:
+        self.grid_size = grid_size
+        self.ships = ships
+        self.sizes = sizes
+        self.ship_cells = ship_cells
+        self.shots = {}
+        self.hits_list = [0] * len(ships)
+        self._ship_index = {}
+        for i in range(len(ships)):
+            self._ship_index[ships[i]] = i
+
+    def make_move(self, row: int, col: int) -> str:
+        """
+        Return 'hit a ship' and update hits_list if there is a ship at row
+        and col, or return 'missed' if there is no ship at row and col.
+        Record the shot in both cases, and print a message if a ship sinks.
+
+        >>> board = SparseBoard(1000, ['a'], [2], {(5, 7): 'a', (5, 8): 'a'})
+        >>> board.make_move(0, 0)
+        'missed'
+        >>> board.make_move(5, 7)
+        'hit a ship'
+        >>> board.make_move(5, 8)
+        The size 2 a ship has been sunk!
+        'hit a ship'
+        >>> board.is_win()
+        True
+        """
+
+        cell = (row, col)
+        if cell not in self.ship_cells:
+            self.shots[cell] = bf.MISS
+            return 'missed'
+
+        if cell not in self.shots:
+            self.shots[cell] = bf.HIT
+            index = self._ship_index[self.ship_cells[cell]]
+            self.hits_list[index] = self.hits_list[index] + 1
+            if self.hits_list[index] == self.sizes[index]:
+                bf.print_sunk_message(self.sizes[index], self.ships[index])
+        return 'hit a ship'
+
+    def is_win(self) -> bool:
+        """
+        Return True iff every ship has been sunk.
+        """
+
+        return bf.is_win(self.sizes, self.hits_list)
+
+    def get_num_moves(self) -> int:
+        """
+        Return the number of cells shot so far.
+        """
+
+        return len(self.shots)
+
+
+def read_sparse_game(game_file: TextIO) -> List:
+    """
+    Return [ships, sizes, grid_size, ship_cells] for the game in game_file,
+    where ship_cells maps (row, col) of every non-EMPTY cell to its
+    character. Each line is searched for non-EMPTY characters without
+    building a list of its cells. Return None if the grid is not square.
+
+    >>> import io
+    >>> game = read_sparse_game(io.StringIO('a\\n2\\n...\\n.a.\\n.a.\\n'))
+    >>> game[:3]
+    [['a'], [2], 3]
+    >>> sorted(game[3].items())
+    [((1, 1), 'a'), ((2, 1), 'a')]
+    """
+
+    ships, sizes = bf.read_ship_data(game_file)
+    ship_cells = {}
+    width = -1
+    row = 0
+    for line in game_file:
+        line = line.strip()
+        if width == -1:
+            width = len(line)
+        elif len(line) != width:
+            return None
+        for match in _SHIP_CELL.finditer(line):
+            ship_cells[(row, match.start())] = match.group()
+        row = row + 1
+
+    if row != width:
+        return None
+    return [ships, sizes, row, ship_cells]
+
+
+def validate_sparse_parameters(grid_size: int, ships: List[str],
+                               sizes: List[int]) -> bool:
+    """
+    Return True iff the grid has at least one cell, ships and sizes have the
+    same non-zero length, every size is valid and every ship has a unique
+    one-character label. These are the checks of
+    play_battleship.validate_game_parameters, without MAX_GRID_SIZE.
+
+    >>> validate_sparse_parameters(5000, ['a', 'b'], [3, 2])
+    True
+    >>> validate_sparse_parameters(5000, ['a', 'a'], [3, 2])
+    False
+    """
+
+    if grid_size == 0 or len(ships) != len(sizes) or len(ships) == 0:
+        return False
+
+    for size in sizes:
+        if size < bf.MIN_SHIP_SIZE or size > bf.MAX_SHIP_SIZE:
+            return False
+
+    for ship in ships:
+        if len(ship) != 1:
+            return False
+    return len(set(ships)) == len(ships)
+
+
+def find_sparse_fleet_problems(ship_cells: Dict[Tuple[int, int], str],
+                               ships: List[str],
+                               sizes: List[int]) -> Dict[str, str]:
+    """
+    Return the problems of battleship_functions.find_fleet_problems for the
+    fleet with ship_cells. This takes time proportional to the number of
+    ship cells.
+
+    >>> find_sparse_fleet_problems({(0, 0): 'a', (900, 0): 'a'}, ['a'], [2])
+    {'a': 'has a gap between its cells'}
+    """
+
+    counts = {}
+    boxes = {}
+    for cell in ship_cells:
+        bf.add_to_box(counts, boxes, ship_cells[cell], cell[0], cell[1])
+    return bf.find_box_problems(counts, boxes, ships, sizes)
+
+
+def load_sparse_game(game_file: TextIO) -> SparseBoard:
+    """
+    Return the SparseBoard for the game in game_file, or None if the game is
+    not valid.
+
+    >>> import io
+    >>> board = load_sparse_game(io.StringIO('a\\n2\\n...\\n.a.\\n.a.\\n'))
+    >>> board.grid_size, board.hits_list
+    (3, [0])
+    >>> load_sparse_game(io.StringIO('a\\n2\\n...\\n.a.\\n..a\\n')) is None
+    True
+    """
+
+    game = read_sparse_game(game_file)
+    if game is None:
+        return None
+
+    ships, sizes, grid_size, ship_cells = game
+    if not validate_sparse_parameters(grid_size, ships, sizes) or \
+       len(find_sparse_fleet_problems(ship_cells, ships, sizes)) > 0:
+        return None
+    return SparseBoard(grid_size, ships, sizes, ship_cells)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
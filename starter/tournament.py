@@ -0,0 +1,236 @@
+"""Round-robin tournaments between computer strategies.
+
+Every strategy (a module:function plugin, as in simulate.py) plays the same
+seeded fleet grids from computer_functions.generate_fleet_grid. In each
+match, two strategies are compared on one grid: the one that sinks the
+fleet in fewer moves wins, and equal move counts are a draw. Because the
+grids are shared, each strategy only has to play each grid once, and the
+games are spread over a pool of worker processes.
+
+The results are each strategy's score (wins plus half the draws, as a
+fraction of its matches) with a 95% Wilson confidence interval, and the
+matching Elo rating difference from an average opponent.
+
+    python tournament.py computer_functions:make_computer_move \\
+        density_targeting:make_density_strategy --games 1000 --csv results.csv
+"""
+
+import argparse
+import csv
+import json
+import math
+import multiprocessing
+from typing import Dict, List, TextIO
+
+import simulate
+
+# The z value of a 95% confidence interval
+Z_95 = 1.96
+
+
+def play_strategies(strategy_names: List[str], num_games: int,
+                    grid_size: int = 10, ships: List[str] = None,
+                    sizes: List[int] = None, seed: int = 0,
+                    processes: int = None,
+                    chunksize: int = 100) -> Dict[str, List[int]]:
+    """
+    Return the number of moves each strategy in strategy_names needed on
+    each of the num_games grids seeded with seed to seed + num_games - 1, by
+    strategy name. The games are played by a pool of processes worker
+    processes.
+    """
+
+    if ships is None:
+        ships = simulate.DEFAULT_SHIPS
+    if sizes is None:
+        sizes = simulate.DEFAULT_SIZES
+
+    tasks = []
+    for name in strategy_names:
+        for first in range(seed, seed + num_games, chunksize):
+            seeds = list(range(first, min(first + chunksize,
+                                          seed + num_games)))
+            tasks.append([name, grid_size, ships, sizes, seeds, False])
+
+    moves = {name: [] for name in strategy_names}
+    with multiprocessing.Pool(processes) as pool:
+        for task, results in zip(tasks, pool.imap(simulate._play_games,
+                                                   tasks)):
+            moves[task[0]].extend(result[0] for result in results)
+    return moves
+
+
+def wilson_interval(score: float, games: int, z: float = Z_95) -> List[float]:
+    """
+    Return the [low, high] Wilson score interval for a score (a fraction)
+    over games.
+
+    >>> [round(bound, 3) for bound in wilson_interval(0.5, 100)]
+    [0.404, 0.596]
+    >>> wilson_interval(1.0, 0)
+    [0.0, 1.0]
+    """
+
+    if games == 0:
+        return [0.0, 1.0]
+    denominator = 1 + z * z / games
+    centre = (score + z * z / (2 * games)) / denominator
+    spread = z * math.sqrt(score * (1 - score) / games +
+                           z * z / (4 * games * games)) / denominator
+    return [max(0.0, centre - spread), min(1.0, centre + spread)]
+
+
+def elo_difference(score: float) -> float:
+    """
+    Return the Elo rating difference that gives an expected score of score,
+    capped at +/-800 for scores of 0 and 1.
+
+    >>> elo_difference(0.5)
+    0.0
+    >>> round(elo_difference(0.75), 1)
+    190.8
+    """
+
+    if score <= 0.0:
+        return -800.0
+    if score >= 1.0:
+        return 800.0
+    return max(-800.0, min(800.0, 400 * math.log10(score / (1 - score))))
+
+
+def score_matches(moves: Dict[str, List[int]]) -> List[Dict]:
+    """
+    Return the result of every pair of strategies in moves, which has the
+    moves each one needed on the same grids, in order.
+
+    >>> score_matches({'a': [30, 40, 50], 'b': [35, 40, 45]})[0]['score']
+    0.5
+    """
+
+    names = list(moves)
+    matches = []
+    for i in range(len(names)):
+        for j in range(i + 1, len(names)):
+            first = moves[names[i]]
+            second = moves[names[j]]
+            wins = sum(1 for a, b in zip(first, second) if a < b)
+            losses = sum(1 for a, b in zip(first, second) if a > b)
+            games = min(len(first), len(second))
+            draws = games - wins - losses
+            score = (wins + draws / 2) / games if games else 0.5
+            low, high = wilson_interval(score, games)
+            matches.append({'strategy': names[i], 'opponent': names[j],
+                            'games': games, 'wins': wins, 'losses': losses,
+                            'draws': draws, 'score': score,
+                            'score_low': low, 'score_high': high})
+    return matches
+
+
+def standings(moves: Dict[str, List[int]], matches: List[Dict]) -> List[Dict]:
+    """
+    Return each strategy's overall result over matches, best score first.
+    """
+
+    totals = {name: [0, 0, 0] for name in moves}
+    for match in matches:
+        for name, wins, losses in [
+                [match['strategy'], match['wins'], match['losses']],
+                [match['opponent'], match['losses'], match['wins']]]:
+            totals[name][0] += wins
+            totals[name][1] += losses
+            totals[name][2] += match['draws']
+
+    table = []
+    for name in moves:
+        wins, losses, draws = totals[name]
+        games = wins + losses + draws
+        score = (wins + draws / 2) / games if games else 0.5
+        low, high = wilson_interval(score, games)
+        count = len(moves[name])
+        table.append({'strategy': name, 'games': games, 'wins': wins,
+                      'losses': losses, 'draws': draws, 'score': score,
+                      'score_low': low, 'score_high': high,
+                      'elo': elo_difference(score),
+                      'elo_low': elo_difference(low),
+                      'elo_high': elo_difference(high),
+                      'moves_mean': sum(moves[name]) / count if count
+                      else None})
+    table.sort(key=lambda row: row['score'], reverse=True)
+    return table
+
+
+def write_csv(csv_file: TextIO, matches: List[Dict]) -> None:
+    """
+    Write one row per match to csv_file.
+    """
+
+    fields = ['strategy', 'opponent', 'games', 'wins', 'losses', 'draws',
+              'score', 'score_low', 'score_high']
+    writer = csv.DictWriter(csv_file, fields)
+    writer.writeheader()
+    for match in matches:
+        writer.writerow(match)
+
+
+def run_tournament(strategy_names: List[str], num_games: int,
+                   grid_size: int = 10, ships: List[str] = None,
+                   sizes: List[int] = None, seed: int = 0,
+                   processes: int = None) -> Dict:
+    """
+    Play a round-robin tournament between strategy_names on num_games shared
+    grids, and return its settings, standings and matches.
+    """
+
+    moves = play_strategies(strategy_names, num_games, grid_size, ships,
+                            sizes, seed, processes)
+    matches = score_matches(moves)
+    return {'games': num_games, 'grid_size': grid_size, 'seed': seed,
+            'standings': standings(moves, matches), 'matches': matches}
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Run a tournament with the command line arguments argv and print the
+    standings.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('strategies', nargs='+',
+                        help='strategy functions, written as module:function')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--grid-size', type=int, default=10)
+    parser.add_argument('--ships', nargs='+', default=simulate.DEFAULT_SHIPS)
+    parser.add_argument('--sizes', nargs='+', type=int,
+                        default=simulate.DEFAULT_SIZES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--csv', help='file to write the matches to')
+    parser.add_argument('--json', help='file to write all the results to')
+    args = parser.parse_args(argv)
+
+    if len(set(args.strategies)) < 2:
+        parser.error('a tournament needs at least two different strategies')
+    for name in args.strategies:
+        simulate.load_strategy(name)
+
+    results = run_tournament(list(dict.fromkeys(args.strategies)),
+                             args.games, args.grid_size, args.ships,
+                             args.sizes, args.seed, args.processes)
+
+    for row in results['standings']:
+        print('{0:45} score {1:.3f} [{2:.3f}, {3:.3f}]  elo {4:+6.0f}  '
+              'mean moves {5:.2f}'.format(row['strategy'], row['score'],
+                                          row['score_low'],
+                                          row['score_high'], row['elo'],
+                                          row['moves_mean']))
+
+    if args.csv is not None:
+        with open(args.csv, 'w', newline='') as csv_file:
+            write_csv(csv_file, results['matches'])
+    if args.json is not None:
+        with open(args.json, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()